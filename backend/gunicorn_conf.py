@@ -0,0 +1,50 @@
+"""Gunicorn configuration for running the API with multiple Uvicorn workers.
+
+Usage:
+    gunicorn main:app -c gunicorn_conf.py
+"""
+import os
+
+from services.executors import available_cpus
+
+host = os.environ.get("API_HOST", "0.0.0.0")
+port = os.environ.get("API_PORT", "8000")
+bind = f"{host}:{port}"
+
+# One process per core (plus headroom) so concurrent uploads are not limited by
+# the GIL; the cores are those of the container's CPU limit, not of the host
+workers = int(os.environ.get("WORKERS") or (2 * available_cpus()) + 1)
+# Workers inherit it to split the cores between their transcription pools
+os.environ["WORKERS"] = str(workers)
+worker_class = "uvicorn_worker.UvloopWorker"
+# Maximum concurrent connections per worker (503 beyond this)
+worker_connections = int(os.environ.get("WORKER_CONNECTIONS", "1000"))
+
+# Heartbeat files on tmpfs avoid worker stalls on slow container filesystems
+worker_tmp_dir = "/dev/shm"
+
+keepalive = 5
+# Video transcriptions can take several minutes
+timeout = 600
+
+accesslog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+
+
+# One whisper-server for all workers: launched by the master before the
+# workers are forked, which reach it through the inherited WHISPER_SERVER_URL.
+# WHISPER_SERVER_MANAGED tells the workers not to launch their own when the
+# master's launch failed.
+_whisper_server_process = None
+
+
+def on_starting(server):
+    global _whisper_server_process
+    from services import whisper_server
+    os.environ["WHISPER_SERVER_MANAGED"] = "1"
+    _whisper_server_process = whisper_server.launch_server()
+
+
+def on_exit(server):
+    from services import whisper_server
+    whisper_server.stop_process(_whisper_server_process)
@@ -1,21 +1,92 @@
-from fastapi import FastAPI, Request
+from fastapi import APIRouter, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from routes.youtube_transcription import router as transcription_router
 from routes.youtube_download import router as download_router
 from routes.audio_transcription import router as audio_transcription_router
 from routes.video_transcription import router as video_transcription_router
+from services import executors, whisper_server
+from contextlib import asynccontextmanager
+import asyncio
 import logging
+import os
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Interactive docs and the OpenAPI schema are only served in debug mode
+ENV = os.environ.get("ENV", "development")
+DEBUG = os.environ.get("DEBUG", "false" if ENV == "production" else "true").lower() == "true"
+
+
+# Payload of the root endpoint, also served by FastPathMiddleware
+ROOT_INFO = {
+    "message": "🎬 Transkiptor API", 
+    "version": "2.0.0",
+    "description": "Sistema completo de transcrição para YouTube, áudios e vídeos",
+    "features": {
+        "youtube_transcription": "Transcrição de vídeos do YouTube via URL",
+        "audio_transcription": "Upload e transcrição de arquivos de áudio (100MB)",
+        "video_transcription": "Upload e transcrição de arquivos de vídeo (5GB)",
+        "formats": ["txt", "srt"],
+        "languages": ["auto", "pt", "en", "es", "fr", "de", "it"]
+    },
+    "endpoints": {
+        "docs": "/docs",
+        "redoc": "/redoc", 
+        "openapi": "/openapi.json"
+    } if DEBUG else {},
+    "status": "running",
+    "engines": ["whisper.cpp", "OpenAI Whisper"]
+}
+
+
+class FastPathMiddleware:
+    """Serve static GET endpoints before CORS, exception handlers and routing.
+
+    Health probes hit these paths constantly, so their responses are
+    rendered once and written straight to the ASGI connection.
+    """
+    
+    def __init__(self, app, responses: dict):
+        self.app = app
+        self.responses = responses
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            response = self.responses.get(scope["path"])
+            if response is not None:
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Create the transcription executors, whisper-server and the OpenAPI schema on startup."""
+    app.state.pool = executors.start_pools()
+    await whisper_server.start_server()
+    if app.openapi_url:
+        # Build the schema once per worker instead of on the first /openapi.json hit
+        app.openapi()
+    yield
+    await whisper_server.stop_server()
+    # Waiting for running transcriptions blocks; do it in the default executor,
+    # not in the thread pool being shut down
+    await asyncio.to_thread(executors.shutdown_pools)
+
+
 app = FastAPI(
     title="Transkiptor API",
     description="🎬 Sistema completo de transcrição para YouTube, áudios e vídeos",
     version="2.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+    docs_url="/docs" if DEBUG else None,
+    redoc_url="/redoc" if DEBUG else None,
+    openapi_url="/openapi.json" if DEBUG else None,
     contact={
         "name": "Transkiptor Support",
         "url": "https://github.com/your-repo/transkiptor",
@@ -36,30 +107,56 @@ app = FastAPI(
     ]
 )
 
+# Keys of Pydantic error dicts left out of 422 responses and logs
+_VALIDATION_ERROR_OMIT = frozenset({"url", "input", "ctx"})
+
 # Custom validation error handler
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
-    logger.error(f"❌ Validation error on {request.url}: {exc.errors()}")
-    return JSONResponse(
+    # ctx may also hold exception objects that orjson cannot serialize
+    errors = [
+        {key: value for key, value in error.items() if key not in _VALIDATION_ERROR_OMIT}
+        for error in exc.errors()
+    ]
+    logger.error("❌ Validation error on %s: %s", request.url, errors)
+    return ORJSONResponse(
         status_code=422,
         content={
             "detail": "Dados inválidos fornecidos",
-            "errors": exc.errors()
+            "errors": errors
         }
     )
 
+# Explicit origins (comma-separated CORS_ORIGINS) instead of wildcards
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.environ.get("CORS_ORIGINS", "http://localhost,http://localhost:3000,http://localhost:80").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type", "authorization"],
+    max_age=86400,  # Let browsers cache preflight responses for a day
 )
 
-app.include_router(transcription_router, prefix="/api/v1")
-app.include_router(download_router, prefix="/api/v1")
-app.include_router(audio_transcription_router, prefix="/api/v1")
-app.include_router(video_transcription_router, prefix="/api/v1")
+# Added last so it wraps every other middleware
+app.add_middleware(
+    FastPathMiddleware,
+    responses={
+        "/": ORJSONResponse(ROOT_INFO),
+        "/api/v1/health": ORJSONResponse({"status": "healthy"}),
+    },
+)
+
+# Mount every versioned router under a single /api/v1 parent
+api_v1 = APIRouter(prefix="/api/v1")
+for versioned_router in (transcription_router, download_router, audio_transcription_router, video_transcription_router):
+    api_v1.include_router(versioned_router)
+app.include_router(api_v1)
 
 
 @app.get("/",
@@ -73,22 +170,4 @@ async def root():
     
     Returns basic information about the Transkiptor API and available endpoints.
     """
-    return {
-        "message": "🎬 Transkiptor API", 
-        "version": "2.0.0",
-        "description": "Sistema completo de transcrição para YouTube, áudios e vídeos",
-        "features": {
-            "youtube_transcription": "Transcrição de vídeos do YouTube via URL",
-            "audio_transcription": "Upload e transcrição de arquivos de áudio (100MB)",
-            "video_transcription": "Upload e transcrição de arquivos de vídeo (5GB)",
-            "formats": ["txt", "srt"],
-            "languages": ["auto", "pt", "en", "es", "fr", "de", "it"]
-        },
-        "endpoints": {
-            "docs": "/docs",
-            "redoc": "/redoc", 
-            "openapi": "/openapi.json"
-        },
-        "status": "running",
-        "engines": ["whisper.cpp", "OpenAI Whisper"]
-    }
\ No newline at end of file
+    return ROOT_INFO
\ No newline at end of file
@@ -1,17 +1,43 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from pydantic import AfterValidator, BaseModel, ConfigDict, HttpUrl, TypeAdapter, ValidationError, WithJsonSchema
+from pydantic_core import PydanticCustomError
+from typing import Annotated, Optional
+
+# Response models are built once from service results and never mutated
+RESPONSE_MODEL_CONFIG = ConfigDict(extra="forbid", frozen=True)
+
+_HTTP_URL_ADAPTER = TypeAdapter(HttpUrl)
+
+
+def _validate_http_url(value: str) -> str:
+    """Validate value as an HTTP(S) URL but keep the original string."""
+    try:
+        _HTTP_URL_ADAPTER.validate_python(value)
+    except ValidationError as e:
+        error = e.errors()[0]
+        raise PydanticCustomError(error["type"], error["msg"], error.get("ctx"))
+    return value
+
+
+# Validated like HttpUrl, but services receive a plain str with no re-serialization
+HttpUrlStr = Annotated[
+    str,
+    AfterValidator(_validate_http_url),
+    WithJsonSchema({"type": "string", "format": "uri", "minLength": 1, "maxLength": 2083})
+]
 
 
 class TranscriptionRequest(BaseModel):
-    url: HttpUrl
+    url: HttpUrlStr
     language: Optional[str] = "auto"
 
 
 class VideoDownloadRequest(BaseModel):
-    url: HttpUrl
+    url: HttpUrlStr
 
 
 class TranscriptionResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     transcription: str
     duration: float
     language: str
@@ -24,6 +50,8 @@ class AudioTranscriptionRequest(BaseModel):
 
 
 class AudioTranscriptionResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     transcription: str
     duration: float
     language: str
@@ -33,5 +61,7 @@ class AudioTranscriptionResponse(BaseModel):
 
 
 class ErrorResponse(BaseModel):
+    model_config = RESPONSE_MODEL_CONFIG
+
     error: str
     success: bool = False
\ No newline at end of file
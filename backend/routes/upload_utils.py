@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+import logging
+from typing import Callable, Optional, Tuple, Type
+import aiofiles
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from starlette.background import BackgroundTask
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger(__name__)
+
+# Room for the multipart boundaries and part headers that Content-Length also counts
+MULTIPART_OVERHEAD_ALLOWANCE = 16 * 1024
+
+# Request chunks are small (~64KB); buffer them so each disk write is ~1MB
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+def upload_temp_root(env_var: str) -> Optional[str]:
+    """Return the directory for streamed uploads, creating it if needed.
+
+    Uses ``env_var`` (e.g. AUDIO_TEMP_DIR on tmpfs, VIDEO_TEMP_DIR on NVMe),
+    then TEMP_DIR, and finally the system default (``TMPDIR``).
+    """
+    path = os.environ.get(env_var) or os.environ.get("TEMP_DIR")
+    if path:
+        os.makedirs(path, exist_ok=True)
+    return path
+
+
+def content_length_limited_route(max_size: int, too_large_detail: str) -> Type[APIRoute]:
+    """Build an APIRoute class that rejects oversized uploads from Content-Length.
+
+    FastAPI parses multipart bodies before resolving dependencies, so the check
+    has to wrap the route handler itself to run before a single body byte is read.
+    """
+    class ContentLengthLimitedRoute(APIRoute):
+        def get_route_handler(self) -> Callable:
+            original_route_handler = super().get_route_handler()
+            
+            async def route_handler(request: Request) -> Response:
+                content_length = request.headers.get("content-length")
+                if content_length is not None:
+                    try:
+                        length = int(content_length)
+                    except ValueError:
+                        raise HTTPException(status_code=400, detail="Cabeçalho Content-Length inválido")
+                    if length > max_size + MULTIPART_OVERHEAD_ALLOWANCE:
+                        raise HTTPException(status_code=413, detail=too_large_detail)
+                return await original_route_handler(request)
+            
+            return route_handler
+    
+    return ContentLengthLimitedRoute
+
+
+async def stream_request_to_file(request: Request, filename: str, max_size: int, too_large_detail: str, temp_root: Optional[str] = None) -> Tuple[str, int]:
+    """Write the raw request body to a temporary file and return its path and size.
+
+    The body is consumed chunk by chunk from ``request.stream()`` so the upload
+    never goes through Starlette's spooled multipart buffer. Chunks are
+    coalesced into ``WRITE_BUFFER_SIZE`` writes, and the request is aborted
+    with 413 as soon as ``max_size`` is exceeded.
+    """
+    temp_dir = tempfile.mkdtemp(dir=temp_root)
+    _, ext = os.path.splitext(filename)
+    temp_file_path = os.path.join(temp_dir, f"uploaded{ext}")
+    size = 0
+    buffer = bytearray()
+
+    try:
+        async with aiofiles.open(temp_file_path, 'wb') as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=413, detail=too_large_detail)
+                buffer += chunk
+                if len(buffer) >= WRITE_BUFFER_SIZE:
+                    await f.write(buffer)
+                    buffer.clear()
+            if buffer:
+                await f.write(buffer)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    logger.info(f"📁 Upload recebido via stream: {temp_file_path} ({size / 1024 / 1024:.1f}MB)")
+    return temp_file_path, size
+
+
+async def transcription_file_response(transcription: str, output_format: str, original_name: Optional[str]) -> FileResponse:
+    """Write a transcription to a temporary file and return it as a download.
+
+    FileResponse sends the file in fixed-size chunks, so the text is not
+    copied again into a response body; the file is removed after sending.
+    """
+    name_without_ext = (original_name or "transcription").rsplit('.', 1)[0]
+    download_filename = f"{name_without_ext}_transcription.{output_format}"
+    content_type = "text/plain" if output_format == "txt" else "application/x-subrip"
+    
+    temp_dir = tempfile.mkdtemp(dir=os.environ.get("TEMP_DIR") or None)
+    file_path = os.path.join(temp_dir, f"transcription.{output_format}")
+    try:
+        async with aiofiles.open(file_path, 'w', encoding='utf-8') as f:
+            await f.write(transcription)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    
+    return FileResponse(
+        path=file_path,
+        media_type=content_type,
+        filename=download_filename,
+        background=BackgroundTask(shutil.rmtree, temp_dir, ignore_errors=True)
+    )
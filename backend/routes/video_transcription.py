@@ -1,17 +1,81 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
-from fastapi.responses import Response
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends, Request, Query
 from models.schemas import AudioTranscriptionResponse, ErrorResponse
-from services.video_service import VideoService
-from typing import Optional
+from routes.upload_utils import stream_request_to_file, content_length_limited_route, upload_temp_root, transcription_file_response
+from typing import Optional, TYPE_CHECKING
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
 
+MAX_VIDEO_SIZE = 5 * 1024 * 1024 * 1024  # 5GB in bytes
+TOO_LARGE_DETAIL = "Arquivo muito grande. Limite de 5GB"
+VIDEO_TEMP_DIR = upload_temp_root("VIDEO_TEMP_DIR")
+
+ALLOWED_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp', '.ogv')
+_VIDEO_EXTENSIONS = frozenset(ext.lstrip('.') for ext in ALLOWED_EXTENSIONS)
+UNSUPPORTED_FORMAT_DETAIL = f"Formato de arquivo não suportado. Use um dos seguintes: {', '.join(ALLOWED_EXTENSIONS)}"
+
+if TYPE_CHECKING:
+    from services.video_service import VideoService
+
+router = APIRouter(route_class=content_length_limited_route(MAX_VIDEO_SIZE, TOO_LARGE_DETAIL))
+
+
+@lru_cache(maxsize=1)
 def get_video_service():
+    # Imported lazily so the service stack is only loaded when first needed
+    from services.video_service import VideoService
     return VideoService()
 
 
+def _validate_upload(filename: Optional[str], output_format: Optional[str]):
+    """Validate the uploaded filename and the requested output format."""
+    if not filename:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo foi enviado")
+    
+    # Check file extension
+    file_ext = filename.rpartition('.')[2].lower()
+    if file_ext not in _VIDEO_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=UNSUPPORTED_FORMAT_DETAIL)
+    
+    # Validate output format
+    if output_format not in ["txt", "srt"]:
+        raise HTTPException(status_code=400, detail="Formato de saída deve ser 'txt' ou 'srt'")
+
+
+async def _transcribe_upload(file: UploadFile, language: Optional[str], output_format: Optional[str], video_service: "VideoService") -> AudioTranscriptionResponse:
+    """Validate and transcribe a multipart upload; shared by the JSON and download endpoints."""
+    # Validate file
+    _validate_upload(file.filename, output_format)
+    
+    # Check file size (limit to 5GB for videos)
+    # Content-Length was already checked by the route class; Starlette counts
+    # the bytes while parsing the form, so no seek over the spool file is needed
+    file_size = file.size or 0
+    if file_size > MAX_VIDEO_SIZE:
+        raise HTTPException(status_code=413, detail=TOO_LARGE_DETAIL)
+    
+    logger.info(f"📹 Recebido vídeo: {file.filename} ({file_size / 1024 / 1024:.1f}MB)")
+    
+    try:
+        result = await video_service.process_video_file(
+            file=file,
+            language=language or "auto",
+            output_format=output_format or "txt"
+        )
+        
+        if result["success"]:
+            return AudioTranscriptionResponse(**result)
+        else:
+            raise HTTPException(status_code=400, detail=result["error"])
+            
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erro na transcrição do vídeo: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.post("/transcribe-video", 
     response_model=AudioTranscriptionResponse,
     summary="Transcribe Video File",
@@ -23,7 +87,7 @@ async def transcribe_video_file(
     file: UploadFile = File(..., description="Video file to transcribe (max 5GB)"),
     language: Optional[str] = Form("auto", description="Language code: 'auto', 'pt', 'en', 'es', 'fr', 'de', 'it'"),
     output_format: Optional[str] = Form("txt", description="Output format: 'txt' for plain text or 'srt' for subtitles with timestamps"),
-    video_service: VideoService = Depends(get_video_service)
+    video_service: "VideoService" = Depends(get_video_service)
 ):
     """
     **Transcribe Video File**
@@ -66,49 +130,68 @@ async def transcribe_video_file(
     - Supported formats only
     - Processing timeout: 10 minutes
     """
-    # Validate file
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Nenhum arquivo foi enviado")
+    return await _transcribe_upload(file, language, output_format, video_service)
+
+
+@router.post("/transcribe-video/stream",
+    response_model=AudioTranscriptionResponse,
+    summary="Transcribe Streamed Video",
+    description="Extract audio from a video sent as the raw request body and transcribe it, without multipart buffering",
+    response_description="Transcription result with metadata",
+    tags=["Video Transcription"],
+    openapi_extra={
+        "requestBody": {
+            "content": {"application/octet-stream": {"schema": {"type": "string", "format": "binary"}}},
+            "required": True
+        }
+    }
+)
+async def transcribe_video_stream(
+    request: Request,
+    filename: str = Query(..., description="Original filename, used to detect the video format"),
+    language: Optional[str] = Query("auto", description="Language code: 'auto', 'pt', 'en', 'es', 'fr', 'de', 'it'"),
+    output_format: Optional[str] = Query("txt", description="Output format: 'txt' for plain text or 'srt' for subtitles with timestamps"),
+    video_service: "VideoService" = Depends(get_video_service)
+):
+    """
+    **Transcribe Streamed Video File**
     
-    # Check file extension
-    allowed_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp', '.ogv']
-    file_ext = file.filename.lower()
-    if not any(file_ext.endswith(ext) for ext in allowed_extensions):
-        raise HTTPException(
-            status_code=400, 
-            detail=f"Formato de arquivo não suportado. Use um dos seguintes: {', '.join(allowed_extensions)}"
-        )
+    Same as `/transcribe-video`, but the video is sent as the raw request body.
+    Recommended for large videos: the body is written straight to disk while it
+    is received, so it never goes through the multipart spool file, and the
+    size check aborts as soon as the 5GB limit is crossed.
     
-    # Validate output format
-    if output_format not in ["txt", "srt"]:
-        raise HTTPException(status_code=400, detail="Formato de saída deve ser 'txt' ou 'srt'")
+    **Parameters (query string):**
+    - **filename**: Original filename (required, used for format detection)
+    - **language**: Target language for transcription (default: "auto")
+    - **output_format**: "txt" (default) or "srt"
     
-    # Check file size (limit to 5GB for videos)
-    max_size = 5 * 1024 * 1024 * 1024  # 5GB in bytes
-    file.file.seek(0, 2)  # Seek to end
-    file_size = file.file.tell()
-    file.file.seek(0)  # Reset to beginning
+    **Example Usage:**
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/transcribe-video/stream?filename=video.mp4&output_format=srt" \\
+         -H "Content-Type: application/octet-stream" \\
+         --data-binary "@video.mp4"
+    ```
+    """
+    _validate_upload(filename, output_format)
     
-    if file_size > max_size:
-        raise HTTPException(status_code=413, detail="Arquivo muito grande. Limite de 5GB")
+    video_path, file_size = await stream_request_to_file(
+        request, filename, MAX_VIDEO_SIZE, TOO_LARGE_DETAIL, VIDEO_TEMP_DIR
+    )
     
-    logger.info(f"📹 Recebido vídeo: {file.filename} ({file_size / 1024 / 1024:.1f}MB)")
+    logger.info(f"📹 Recebido vídeo: {filename} ({file_size / 1024 / 1024:.1f}MB)")
     
-    try:
-        result = await video_service.process_video_file(
-            file=file,
-            language=language or "auto",
-            output_format=output_format or "txt"
-        )
-        
-        if result["success"]:
-            return AudioTranscriptionResponse(**result)
-        else:
-            raise HTTPException(status_code=400, detail=result["error"])
-            
-    except Exception as e:
-        logger.error(f"❌ Erro na transcrição do vídeo: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+    result = await video_service.process_video_path(
+        video_path,
+        filename,
+        language=language or "auto",
+        output_format=output_format or "txt"
+    )
+    
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["error"])
+    
+    return AudioTranscriptionResponse(**result)
 
 
 @router.post("/transcribe-video/download",
@@ -121,7 +204,7 @@ async def download_video_transcription(
     file: UploadFile = File(..., description="Video file to transcribe (max 5GB)"),
     language: Optional[str] = Form("auto", description="Language code: 'auto', 'pt', 'en', 'es', 'fr', 'de', 'it'"),
     output_format: Optional[str] = Form("txt", description="Output format: 'txt' for plain text or 'srt' for subtitles with timestamps"),
-    video_service: VideoService = Depends(get_video_service)
+    video_service: "VideoService" = Depends(get_video_service)
 ):
     """
     **Transcribe Video File and Download**
@@ -158,22 +241,10 @@ async def download_video_transcription(
          --output transcricao.srt
     ```
     """
-    # Use the same validation and processing as the regular endpoint
-    result = await transcribe_video_file(file, language, output_format, video_service)
-    
-    # Create filename
-    original_name = file.filename or "transcription"
-    name_without_ext = original_name.rsplit('.', 1)[0]
-    download_filename = f"{name_without_ext}_transcription.{output_format}"
+    # Same pipeline as the regular endpoint, rendered as a file instead of JSON
+    result = await _transcribe_upload(file, language, output_format, video_service)
     
-    # Set appropriate content type
-    content_type = "text/plain" if output_format == "txt" else "application/x-subrip"
-    
-    return Response(
-        content=result.transcription,
-        media_type=content_type,
-        headers={"Content-Disposition": f"attachment; filename={download_filename}"}
-    )
+    return await transcription_file_response(result.transcription, output_format, file.filename)
 
 
 @router.get("/health")
@@ -1,16 +1,28 @@
 import os
+import shutil
 import logging
-from fastapi import APIRouter, HTTPException, Request
+import anyio
+from fastapi import APIRouter, HTTPException, Request, Depends
 from fastapi.responses import FileResponse
 from fastapi.exceptions import RequestValidationError
 from models.schemas import VideoDownloadRequest, ErrorResponse
-from services.youtube_download_service import VideoDownloadService
+from typing import TYPE_CHECKING
+from functools import lru_cache
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from services.youtube_download_service import VideoDownloadService
+
 router = APIRouter()
-download_service = VideoDownloadService()
+
+
+@lru_cache(maxsize=1)
+def get_download_service():
+    # Imported lazily so yt-dlp is only loaded when first needed
+    from services.youtube_download_service import VideoDownloadService
+    return VideoDownloadService()
 
 
 @router.post("/download-youtube",
@@ -19,7 +31,10 @@ download_service = VideoDownloadService()
     response_description="Video file as download (MP4 format)",
     tags=["YouTube Download"]
 )
-async def download_video(request: VideoDownloadRequest):
+async def download_video(
+    request: VideoDownloadRequest,
+    download_service: "VideoDownloadService" = Depends(get_download_service)
+):
     """
     **Download YouTube Video**
     
@@ -91,7 +106,7 @@ async def download_video(request: VideoDownloadRequest):
         logger.info(f"📥 Iniciando download do vídeo: {request.url}")
         
         # Download video
-        video_file, filename, metadata = await download_service.download_video(str(request.url))
+        video_file, filename, metadata = await download_service.download_video(request.url)
         
         # Check if file exists
         if not os.path.exists(video_file):
@@ -99,16 +114,8 @@ async def download_video(request: VideoDownloadRequest):
         
         # Return file for download with proper headers
         async def cleanup_file():
-            """Clean up the temporary file after sending"""
-            try:
-                if os.path.exists(video_file):
-                    os.remove(video_file)
-                    # Also remove the directory if it's empty
-                    temp_dir = os.path.dirname(video_file)
-                    if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-                        os.rmdir(temp_dir)
-            except Exception as e:
-                logger.warning(f"⚠️ Erro ao limpar arquivo temporário: {e}")
+            """Remove the per-download temporary directory after sending"""
+            await anyio.to_thread.run_sync(shutil.rmtree, os.path.dirname(video_file), True)
         
         logger.info(f"✅ Download concluído: {filename}")
         
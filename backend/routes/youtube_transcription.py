@@ -1,10 +1,17 @@
 from fastapi import APIRouter, HTTPException, Depends
 from models.schemas import TranscriptionRequest, TranscriptionResponse, ErrorResponse
-from services.youtube_service import YouTubeService
+from typing import TYPE_CHECKING
+from functools import lru_cache
+
+if TYPE_CHECKING:
+    from services.youtube_service import YouTubeService
 
 router = APIRouter()
 
+@lru_cache(maxsize=1)
 def get_youtube_service():
+    # Imported lazily so the service stack is only loaded when first needed
+    from services.youtube_service import YouTubeService
     return YouTubeService()
 
 
@@ -17,7 +24,7 @@ def get_youtube_service():
 )
 async def transcribe_video(
     request: TranscriptionRequest,
-    youtube_service: YouTubeService = Depends(get_youtube_service)
+    youtube_service: "YouTubeService" = Depends(get_youtube_service)
 ):
     """
     **Transcribe YouTube Video Audio**
@@ -77,7 +84,7 @@ async def transcribe_video(
     """
     try:
         result = await youtube_service.process_youtube_video(
-            str(request.url), 
+            request.url, 
             request.language or "auto"
         )
         
@@ -1,13 +1,21 @@
 import os
+import re
+import asyncio
 import tempfile
 import subprocess
-import json
+import orjson
 import logging
 import shutil
+import wave
+from dataclasses import dataclass
 from typing import Tuple, Optional
+from functools import lru_cache
+from pathlib import Path
 import aiofiles
 from fastapi import UploadFile
 from .whisper_python_service import WhisperPythonService
+from .executors import SPAWN_KWARGS, available_cpus, run_in_thread, run_process
+from . import whisper_server
 
 # Import imageio_ffmpeg only as fallback
 try:
@@ -20,6 +28,210 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# One SRT cue: sequence number, "start --> end" line and its non-empty text lines
+_SRT_CUE_RE = re.compile(
+    r'^\d+\n(\d+:\d\d:\d\d,\d{3}) --> (\d+:\d\d:\d\d,\d{3})\n((?:.+\n?)+)',
+    re.MULTILINE
+)
+
+# whisper.cpp reports the language it detected on stderr, e.g.
+# "whisper_full_with_state: auto-detected language: en (p = 0.97)"
+_WHISPER_CPP_LANGUAGE_RE = re.compile(rb'auto-detected language: (\w+)')
+
+# Chunk size used when copying uploads to disk
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB
+
+# ISO-BMFF containers usually keep their index (moov atom) at the end of the
+# file, which FFmpeg cannot reach on a non-seekable pipe
+NON_PIPEABLE_EXTENSIONS = frozenset({'.mp4', '.m4a', '.m4v', '.mov', '.3gp'})
+
+# Quantized whisper.cpp weights (e.g. q5_1, q4_k, q8_0) run the encoder's
+# dot products on packed integers; an empty value selects the FP16 model
+WHISPER_MODEL_QUANT = os.environ.get("WHISPER_MODEL_QUANT", "q5_1").strip().lower()
+
+
+# whisper.cpp defaults to 4 threads; use the available cores, capped by WHISPER_THREADS
+# so several concurrent transcriptions do not oversubscribe the host
+WHISPER_CPP_THREADS = max(1, min(int(os.environ.get("WHISPER_THREADS") or available_cpus()), available_cpus()))
+
+
+def whisper_cpp_thread_args(env: dict) -> list:
+    """Return the whisper.cpp thread arguments, pinning its OpenMP threads in env."""
+    env['OMP_NUM_THREADS'] = str(WHISPER_CPP_THREADS)
+    env['OMP_PROC_BIND'] = 'close'
+    env['OMP_PLACES'] = 'cores'
+    return ["-t", str(WHISPER_CPP_THREADS)]
+
+
+@lru_cache(maxsize=None)
+def resolve_whisper_cpp_model(model_dir: str, model_name: str = "base") -> str:
+    """Return the path of the whisper.cpp model to load, preferring the quantized file."""
+    default_path = os.path.join(model_dir, f"ggml-{model_name}.bin")
+    if WHISPER_MODEL_QUANT:
+        quantized_path = os.path.join(model_dir, f"ggml-{model_name}-{WHISPER_MODEL_QUANT}.bin")
+        if os.path.exists(quantized_path):
+            logger.info(f"✅ Modelo quantizado do whisper.cpp: {quantized_path}")
+            return quantized_path
+        logger.warning(f"⚠️ Modelo quantizado não encontrado ({quantized_path}), usando {default_path}")
+    return default_path
+
+
+
+def _sendfile_copy(src_fd: int, dst_path: str, offset: int):
+    """Copy src_fd from offset to the end into dst_path without user-space buffers."""
+    dst_fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        while sent := os.sendfile(dst_fd, src_fd, offset, UPLOAD_CHUNK_SIZE):
+            offset += sent
+    finally:
+        os.close(dst_fd)
+
+
+async def save_upload_to_path(file: UploadFile, dst_path: str):
+    """Write an UploadFile to dst_path.
+
+    Uploads that Starlette already spooled to disk are copied kernel-to-kernel
+    with os.sendfile; in-memory uploads (or a failed sendfile) use chunked reads.
+    """
+    src = file.file
+    # SpooledTemporaryFile.fileno() would force an in-memory upload onto disk
+    if hasattr(os, 'sendfile') and getattr(src, '_rolled', True):
+        try:
+            await run_in_thread(_sendfile_copy, src.fileno(), dst_path, src.tell())
+            return
+        except (AttributeError, OSError) as e:
+            logger.warning(f"⚠️ sendfile indisponível, copiando upload em blocos: {e}")
+    
+    async with aiofiles.open(dst_path, 'wb') as f:
+        # Copy in fixed-size chunks so memory stays bounded for large uploads
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await f.write(chunk)
+
+
+async def probe_duration(probe_cmd: str, media_file: str) -> float:
+    """Return the container duration reported by ffprobe, or 0.0.
+
+    The header-only probe answers in milliseconds even for large files; the
+    full probe only runs when the header carries no duration ("N/A").
+    """
+    for probe_args in (["-probesize", "32k", "-analyzeduration", "0"], []):
+        cmd = [
+            probe_cmd, "-v", "quiet", *probe_args, "-show_entries",
+            "format=duration", "-of", "csv=p=0", media_file
+        ]
+        
+        result = await run_process(cmd, timeout=30)
+        if result.returncode == 0:
+            try:
+                return float(result.stdout.strip())
+            except ValueError:
+                pass
+    
+    return 0.0
+
+
+def prefetch_file(path: str):
+    """Ask the kernel to start reading path into the page cache.
+
+    whisper.cpp then finds the audio in memory instead of waiting on the
+    device, e.g. when a file is transcribed again with another language.
+    Blocking; call it through run_in_thread.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            # WILLNEED fills the shared page cache; per-descriptor hints such
+            # as SEQUENTIAL would not reach whisper.cpp's own open of the file
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+    except OSError:
+        pass  # Only a hint
+
+
+def wav_duration(wav_file: str) -> float:
+    """Read the duration of a PCM WAV file from its header (0.0 if unreadable)."""
+    try:
+        with wave.open(wav_file, 'rb') as wav:
+            return wav.getnframes() / float(wav.getframerate())
+    except Exception as e:
+        logger.warning(f"⚠️ Erro ao obter duração do áudio: {e}")
+        return 0.0
+
+
+@dataclass(frozen=True)
+class BinaryPaths:
+    """External binaries found under backend/tools (or their fallbacks)."""
+    ffmpeg_path: Optional[str]
+    ffprobe_path: Optional[str]
+    local_ffmpeg_path: Optional[str]  # tools/ffmpeg binary only, without the imageio fallback
+    whisper_cpp_path: str
+    whisper_cpp_available: bool
+
+
+@lru_cache(maxsize=1)
+def resolve_binaries() -> BinaryPaths:
+    """Locate FFmpeg and whisper.cpp once per process; every service reads the result."""
+    # Use local FFmpeg binaries from backend/tools/ffmpeg
+    backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ffmpeg_dir = os.path.join(backend_root, 'tools', 'ffmpeg')
+    ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
+    ffprobe_path = os.path.join(ffmpeg_dir, 'ffprobe')
+    
+    # Check if local FFmpeg binaries exist and are executable
+    if os.path.exists(ffmpeg_path) and os.access(ffmpeg_path, os.X_OK):
+        local_ffmpeg_path = ffmpeg_path
+        logger.info(f"✅ FFmpeg local encontrado: {ffmpeg_path}")
+        if os.path.exists(ffprobe_path) and os.access(ffprobe_path, os.X_OK):
+            logger.info(f"✅ FFprobe local encontrado: {ffprobe_path}")
+        else:
+            logger.warning(f"⚠️ FFprobe não encontrado: {ffprobe_path}")
+    else:
+        local_ffmpeg_path = None
+        logger.warning(f"⚠️ FFmpeg local não encontrado: {ffmpeg_path}")
+        # Fallback to imageio-ffmpeg if available
+        if IMAGEIO_FFMPEG_AVAILABLE:
+            try:
+                ffmpeg_path = ffmpeg.get_ffmpeg_exe()
+                ffprobe_path = None
+                logger.info(f"🔄 Usando imageio-ffmpeg como fallback: {ffmpeg_path}")
+            except Exception as e:
+                logger.error(f"❌ Erro ao usar imageio-ffmpeg: {e}")
+                ffmpeg_path = None
+                ffprobe_path = None
+        else:
+            logger.error(f"❌ Nenhum FFmpeg disponível (imageio-ffmpeg não instalado)")
+            ffmpeg_path = None
+            ffprobe_path = None
+    
+    # Check for whisper.cpp (real C++ implementation) first
+    whisper_cpp_dir = os.path.join(backend_root, 'tools', 'whisper_cpp')
+    # Try whisper-cli first, fallback to main for compatibility
+    whisper_cli_path = os.path.join(whisper_cpp_dir, 'whisper-cli')
+    main_path = os.path.join(whisper_cpp_dir, 'main')
+    
+    if os.path.exists(whisper_cli_path) and os.access(whisper_cli_path, os.X_OK):
+        whisper_cpp_path = whisper_cli_path
+    else:
+        whisper_cpp_path = main_path
+    
+    if os.path.exists(whisper_cpp_path) and os.access(whisper_cpp_path, os.X_OK):
+        logger.info(f"✅ whisper.cpp encontrado: {whisper_cpp_path}")
+        whisper_cpp_available = True
+    else:
+        logger.warning(f"❌ whisper.cpp não encontrado: {whisper_cpp_path}")
+        whisper_cpp_available = False
+    
+    return BinaryPaths(
+        ffmpeg_path=ffmpeg_path,
+        ffprobe_path=ffprobe_path,
+        local_ffmpeg_path=local_ffmpeg_path,
+        whisper_cpp_path=whisper_cpp_path,
+        whisper_cpp_available=whisper_cpp_available
+    )
+
 
 class AudioService:
     """Service for processing uploaded audio files."""
@@ -30,53 +242,11 @@ class AudioService:
     
     def _check_dependencies(self):
         """Check if required dependencies are available."""
-        # Use local FFmpeg binaries from backend/tools/ffmpeg
-        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ffmpeg_dir = os.path.join(backend_root, 'tools', 'ffmpeg')
-        self.ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
-        self.ffprobe_path = os.path.join(ffmpeg_dir, 'ffprobe')
-        
-        # Check if local FFmpeg binaries exist and are executable
-        if os.path.exists(self.ffmpeg_path) and os.access(self.ffmpeg_path, os.X_OK):
-            logger.info(f"✅ FFmpeg local encontrado: {self.ffmpeg_path}")
-            if os.path.exists(self.ffprobe_path) and os.access(self.ffprobe_path, os.X_OK):
-                logger.info(f"✅ FFprobe local encontrado: {self.ffprobe_path}")
-            else:
-                logger.warning(f"⚠️ FFprobe não encontrado: {self.ffprobe_path}")
-        else:
-            logger.warning(f"⚠️ FFmpeg local não encontrado: {self.ffmpeg_path}")
-            # Fallback to imageio-ffmpeg if available
-            if IMAGEIO_FFMPEG_AVAILABLE:
-                try:
-                    self.ffmpeg_path = ffmpeg.get_ffmpeg_exe()
-                    self.ffprobe_path = None
-                    logger.info(f"🔄 Usando imageio-ffmpeg como fallback: {self.ffmpeg_path}")
-                except Exception as e:
-                    logger.error(f"❌ Erro ao usar imageio-ffmpeg: {e}")
-                    self.ffmpeg_path = None
-                    self.ffprobe_path = None
-            else:
-                logger.error(f"❌ Nenhum FFmpeg disponível (imageio-ffmpeg não instalado)")
-                self.ffmpeg_path = None
-                self.ffprobe_path = None
-        
-        # Check for whisper.cpp (real C++ implementation) first
-        whisper_cpp_dir = os.path.join(backend_root, 'tools', 'whisper_cpp')
-        # Try whisper-cli first, fallback to main for compatibility
-        whisper_cli_path = os.path.join(whisper_cpp_dir, 'whisper-cli')
-        main_path = os.path.join(whisper_cpp_dir, 'main')
-        
-        if os.path.exists(whisper_cli_path) and os.access(whisper_cli_path, os.X_OK):
-            self.whisper_cpp_path = whisper_cli_path
-        else:
-            self.whisper_cpp_path = main_path
-        
-        if os.path.exists(self.whisper_cpp_path) and os.access(self.whisper_cpp_path, os.X_OK):
-            logger.info(f"✅ whisper.cpp encontrado: {self.whisper_cpp_path}")
-            self.whisper_cpp_available = True
-        else:
-            logger.warning(f"❌ whisper.cpp não encontrado: {self.whisper_cpp_path}")
-            self.whisper_cpp_available = False
+        binaries = resolve_binaries()
+        self.ffmpeg_path = binaries.ffmpeg_path
+        self.ffprobe_path = binaries.ffprobe_path
+        self.whisper_cpp_path = binaries.whisper_cpp_path
+        self.whisper_cpp_available = binaries.whisper_cpp_available
         
         # Log the transcription options available
         options = []
@@ -101,21 +271,45 @@ class AudioService:
         else:
             ext = '.wav'  # default extension
         
+        # Convert while reading the upload instead of saving it and reading it back
+        if self.ffmpeg_path and ext.lower() != '.wav' and ext.lower() not in NON_PIPEABLE_EXTENSIONS:
+            wav_file_path = os.path.join(temp_dir, "uploaded_audio_converted.wav")
+            try:
+                await self.stream_upload_to_wav(file, wav_file_path)
+                return wav_file_path, self.get_wav_duration(wav_file_path)
+            except Exception as e:
+                logger.warning(f"⚠️ Conversão via pipe falhou, salvando arquivo original: {e}")
+                self._cleanup_temp_dir(temp_dir)
+                temp_dir = tempfile.mkdtemp()
+                await file.seek(0)
+        
         # Save uploaded file
         temp_file_path = os.path.join(temp_dir, f"uploaded_audio{ext}")
         
         try:
-            async with aiofiles.open(temp_file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+            await save_upload_to_path(file, temp_file_path)
             
             logger.info(f"📁 Arquivo salvo: {temp_file_path}")
-            
-            # Get audio duration
-            duration = await self._get_audio_duration(temp_file_path)
+        except Exception as e:
+            # Clean up on error
+            self._cleanup_temp_dir(temp_dir)
+            raise Exception(f"Erro ao processar arquivo: {str(e)}")
+        
+        return await self.prepare_audio_file(temp_file_path)
+    
+    async def prepare_audio_file(self, temp_file_path: str) -> Tuple[str, float]:
+        """Probe duration and convert an already saved upload to WAV."""
+        try:
+            # Probe the duration while FFmpeg converts the same file
+            duration_task = asyncio.ensure_future(self._get_audio_duration(temp_file_path))
             
             # Convert to WAV if needed
-            wav_file_path = await self._convert_to_wav(temp_file_path)
+            try:
+                wav_file_path = await self._convert_to_wav(temp_file_path)
+            except BaseException:
+                duration_task.cancel()
+                raise
+            duration = await duration_task
             
             # Remove original file if conversion was done
             if wav_file_path != temp_file_path and os.path.exists(temp_file_path):
@@ -125,9 +319,53 @@ class AudioService:
             
         except Exception as e:
             # Clean up on error
-            self._cleanup_temp_dir(temp_dir)
+            self._cleanup_temp_dir(os.path.dirname(temp_file_path))
             raise Exception(f"Erro ao processar arquivo: {str(e)}")
     
+    async def stream_upload_to_wav(self, file: UploadFile, wav_file: str, input_args: Optional[list] = None):
+        """Pipe an upload through FFmpeg's stdin, writing 16kHz mono PCM WAV to wav_file."""
+        cmd = [
+            self.ffmpeg_path, "-hide_banner", *(input_args or []), "-i", "pipe:0",
+            "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1", wav_file, "-y"
+        ]
+        
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+            **SPAWN_KWARGS
+        )
+        # Drain stderr concurrently so FFmpeg never blocks on a full pipe
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        
+        try:
+            try:
+                while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                    process.stdin.write(chunk)
+                    await process.stdin.drain()
+                process.stdin.close()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # FFmpeg exited early; its stderr tells why
+            
+            await asyncio.wait_for(process.wait(), timeout=300)
+            stderr = await stderr_task
+        except BaseException:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            stderr_task.cancel()
+            raise
+        
+        if process.returncode != 0:
+            raise Exception(f"Erro na conversão para WAV: {stderr.decode(errors='replace')[-1000:]}")
+        
+        logger.info(f"🔄 Upload convertido para WAV via pipe: {wav_file}")
+    
+    def get_wav_duration(self, wav_file: str) -> float:
+        """Read the duration of a PCM WAV file from its header."""
+        return wav_duration(wav_file)
+    
     async def _get_audio_duration(self, audio_file: str) -> float:
         """Get audio file duration using FFprobe."""
         if not self.ffmpeg_path:
@@ -135,14 +373,7 @@ class AudioService:
         
         try:
             probe_cmd = self.ffprobe_path if self.ffprobe_path else self.ffmpeg_path
-            cmd = [
-                probe_cmd, "-v", "quiet", "-show_entries", 
-                "format=duration", "-of", "csv=p=0", audio_file
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                return float(result.stdout.strip())
+            return await probe_duration(probe_cmd, audio_file)
         except Exception as e:
             logger.warning(f"⚠️ Erro ao obter duração do áudio: {e}")
         
@@ -166,12 +397,12 @@ class AudioService:
                 "-ar", "16000", "-ac", "1", wav_file, "-y"
             ]
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+            result = await run_process(cmd, timeout=120)
             if result.returncode == 0:
                 logger.info(f"🔄 Arquivo convertido para WAV: {wav_file}")
                 return wav_file
             else:
-                logger.warning(f"⚠️ Erro na conversão para WAV: {result.stderr}")
+                logger.warning(f"⚠️ Erro na conversão para WAV: {result.stderr.decode(errors='replace')}")
                 return input_file
                 
         except Exception as e:
@@ -207,9 +438,19 @@ class AudioService:
     
     async def _transcribe_with_whisper_cpp(self, audio_file: str, language: str = "auto", with_timestamps: bool = False) -> Tuple[str, str, Optional[list]]:
         """Transcribe using real whisper.cpp (C++ implementation)."""
+        await run_in_thread(prefetch_file, audio_file)
+        
+        # Prefer the long-lived whisper-server, which already has the model loaded
+        if whisper_server.is_available():
+            try:
+                transcription, detected_language, segments = await whisper_server.transcribe(audio_file, language)
+                return transcription, detected_language, segments if with_timestamps else None
+            except Exception as e:
+                logger.warning(f"⚠️ whisper-server falhou, executando whisper.cpp: {e}")
+        
         # Get model path (relative to backend root)
         backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_path = os.path.join(backend_root, 'tools', 'whisper_cpp', 'ggml-base.bin')
+        model_path = resolve_whisper_cpp_model(os.path.join(backend_root, 'tools', 'whisper_cpp'))
         
         # Map language parameter for whisper.cpp
         if language == "auto":
@@ -220,26 +461,26 @@ class AudioService:
         # Build command for whisper.cpp
         base_cmd = [self.whisper_cpp_path, "-m", model_path, "-f", audio_file] + lang_param
         if with_timestamps:
-            # Generate both JSON and SRT for timestamps
-            cmd = base_cmd + ["-oj", "-osrt"]
+            # SRT carries the timestamps; the language is read from stderr
+            cmd = base_cmd + ["-osrt"]
         else:
             cmd = base_cmd + ["-oj"]
         
-        logger.info(f"🤖 Executando whisper.cpp: {' '.join(cmd)}")
-        
         # Set environment to find shared libraries
         env = os.environ.copy()
         whisper_cpp_dir = os.path.dirname(self.whisper_cpp_path)
         env['LD_LIBRARY_PATH'] = f"{whisper_cpp_dir}:{env.get('LD_LIBRARY_PATH', '')}"
+        cmd += whisper_cpp_thread_args(env)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🤖 Executando whisper.cpp: %s", ' '.join(cmd))
         
         try:
-            result = subprocess.run(
+            result = await run_process(
                 cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True,
                 timeout=300,  # 5 minutes timeout
-                env=env
+                env=env,
+                check=True
             )
             logger.info(f"✅ whisper.cpp executado com sucesso")
             
@@ -253,97 +494,93 @@ class AudioService:
                     segments = await self._parse_srt_file(srt_file)
                     transcription = " ".join(segment['text'] for segment in segments)
                     
-                    # Get language from JSON if available
+                    # Get language from the "auto-detected language" log line
                     detected_language = language
-                    if os.path.exists(json_file):
-                        async with aiofiles.open(json_file, 'r') as f:
-                            content = await f.read()
-                            data = json.loads(content)
-                            if 'result' in data and 'language' in data['result']:
-                                detected_language = data['result']['language']
-                            elif 'language' in data:
-                                detected_language = data['language']
+                    language_match = _WHISPER_CPP_LANGUAGE_RE.search(result.stderr)
+                    if language_match:
+                        detected_language = language_match[1].decode()
                     
                     # Clean up files
-                    if os.path.exists(json_file):
-                        os.remove(json_file)
                     os.remove(srt_file)
                     
                     return transcription.strip(), detected_language, segments
                     
                 except Exception as e:
                     logger.warning(f"⚠️ Erro ao processar arquivo SRT: {e}")
-                    # Fall back to JSON processing
+                    # Fall back to the stdout transcription below
             
             if os.path.exists(json_file):
-                async with aiofiles.open(json_file, 'r') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    
-                    # Debug: Log the structure of the JSON data
-                    logger.info(f"🐛 Debug - Estrutura do JSON whisper.cpp: {list(data.keys())}")
+                content = await run_in_thread(Path(json_file).read_bytes)
+                data = orjson.loads(content)
+                
+                # Debug: Log the structure of the JSON data (skipped unless DEBUG is enabled)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("🐛 Debug - Estrutura do JSON whisper.cpp: %s", list(data.keys()))
                     if 'transcription' in data:
-                        logger.info(f"🐛 Debug - Tipo de 'transcription': {type(data['transcription'])}")
+                        logger.debug("🐛 Debug - Tipo de 'transcription': %s", type(data['transcription']))
                         if isinstance(data['transcription'], list) and len(data['transcription']) > 0:
-                            logger.info(f"🐛 Debug - Primeiro elemento transcription: {data['transcription'][0]}")
+                            logger.debug("🐛 Debug - Primeiro elemento transcription: %s", data['transcription'][0])
                     if 'segments' in data:
-                        logger.info(f"🐛 Debug - Tipo de 'segments': {type(data['segments'])}")
+                        logger.debug("🐛 Debug - Tipo de 'segments': %s", type(data['segments']))
                         if isinstance(data['segments'], list) and len(data['segments']) > 0:
-                            logger.info(f"🐛 Debug - Primeiro elemento segments: {data['segments'][0]}")
-                    
-                    # Extract transcription and segments from whisper.cpp JSON format
-                    transcription = ""
-                    segments = []
-                    
-                    if 'transcription' in data and isinstance(data['transcription'], list):
-                        # whisper.cpp format: list of segments with 'text' field
-                        for segment in data['transcription']:
-                            if isinstance(segment, dict) and 'text' in segment:
-                                text = segment['text'].strip()
-                                transcription += text
+                            logger.debug("🐛 Debug - Primeiro elemento segments: %s", data['segments'][0])
+                
+                # Extract transcription and segments from whisper.cpp JSON format
+                transcription = ""
+                text_parts = []
+                segments = []
+                
+                if 'transcription' in data and isinstance(data['transcription'], list):
+                    # whisper.cpp format: list of segments with 'text' field
+                    for segment in data['transcription']:
+                        if isinstance(segment, dict) and 'text' in segment:
+                            text = segment['text'].strip()
+                            text_parts.append(text)
+                            if with_timestamps and text:
+                                segments.append({
+                                    'start': segment.get('start', 0),
+                                    'end': segment.get('end', 0),
+                                    'text': text
+                                })
+                        else:
+                            text_parts.append(str(segment))
+                    transcription = "".join(text_parts)
+                elif 'text' in data:
+                    if isinstance(data['text'], list):
+                        transcription = ' '.join(str(item) for item in data['text'])
+                    else:
+                        transcription = str(data['text'])
+                else:
+                    # Try to extract from segments (OpenAI format)
+                    if 'segments' in data:
+                        for segment in data['segments']:
+                            if 'text' in segment:
+                                text = str(segment['text']).strip()
+                                text_parts.append(text)
                                 if with_timestamps and text:
                                     segments.append({
                                         'start': segment.get('start', 0),
                                         'end': segment.get('end', 0),
                                         'text': text
                                     })
-                            else:
-                                transcription += str(segment)
-                    elif 'text' in data:
-                        if isinstance(data['text'], list):
-                            transcription = ' '.join(str(item) for item in data['text'])
-                        else:
-                            transcription = str(data['text'])
+                        transcription = "".join(text_parts)
                     else:
-                        # Try to extract from segments (OpenAI format)
-                        if 'segments' in data:
-                            for segment in data['segments']:
-                                if 'text' in segment:
-                                    text = str(segment['text']).strip()
-                                    transcription += text
-                                    if with_timestamps and text:
-                                        segments.append({
-                                            'start': segment.get('start', 0),
-                                            'end': segment.get('end', 0),
-                                            'text': text
-                                        })
-                        else:
-                            transcription = str(data)
-                    
-                    # Get detected language from whisper.cpp JSON format
-                    detected_language = language  # default
-                    if 'result' in data and 'language' in data['result']:
-                        detected_language = data['result']['language']
-                    elif 'language' in data:
-                        detected_language = data['language']
-                    
-                    # Clean up JSON file
-                    os.remove(json_file)
-                    
-                    return transcription.strip(), detected_language, segments if with_timestamps else None
+                        transcription = str(data)
+                
+                # Get detected language from whisper.cpp JSON format
+                detected_language = language  # default
+                if 'result' in data and 'language' in data['result']:
+                    detected_language = data['result']['language']
+                elif 'language' in data:
+                    detected_language = data['language']
+                
+                # Clean up JSON file
+                os.remove(json_file)
+                
+                return transcription.strip(), detected_language, segments if with_timestamps else None
             else:
                 # Fallback: parse stdout if JSON file not found
-                return result.stdout.strip(), language, None
+                return result.stdout.decode(errors='replace').strip(), language, None
                 
         except subprocess.CalledProcessError as e:
             error_msg = e.stderr or str(e)
@@ -359,7 +596,8 @@ class AudioService:
     
     def _format_srt_timestamps(self, segments: list) -> str:
         """Format segments into SRT subtitle format."""
-        srt_content = ""
+        # Joined once at the end; on CPython this beats io.StringIO writes
+        cues = []
         
         for i, segment in enumerate(segments, 1):
             start = segment.get('start', 0)
@@ -373,66 +611,54 @@ class AudioService:
             start_time = self._seconds_to_srt_time(start)
             end_time = self._seconds_to_srt_time(end)
             
-            srt_content += f"{i}\n{start_time} --> {end_time}\n{text}\n\n"
+            cues.append(f"{i}\n{start_time} --> {end_time}\n{text}")
         
-        return srt_content.strip()
+        return "\n\n".join(cues)
     
     def _seconds_to_srt_time(self, seconds: float) -> str:
         """Convert seconds to SRT timestamp format."""
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        milliseconds = int((seconds % 1) * 1000)
+        # Round once to integer milliseconds so cues never drift at exact seconds
+        milliseconds = int(round(seconds * 1000))
+        secs, milliseconds = divmod(milliseconds, 1000)
+        minutes, secs = divmod(secs, 60)
+        hours, minutes = divmod(minutes, 60)
         
         return f"{hours:02d}:{minutes:02d}:{secs:02d},{milliseconds:03d}"
     
     async def _parse_srt_file(self, srt_file: str) -> list:
         """Parse SRT file generated by whisper.cpp to extract segments with timestamps."""
-        segments = []
-        
-        async with aiofiles.open(srt_file, 'r', encoding='utf-8') as f:
-            content = await f.read()
-        
-        # Parse SRT format
-        blocks = content.strip().split('\n\n')
-        
-        for block in blocks:
-            lines = block.strip().split('\n')
-            if len(lines) >= 3:
-                # lines[0] = sequence number
-                # lines[1] = timestamp
-                # lines[2+] = text
-                timestamp_line = lines[1]
-                text = ' '.join(lines[2:])
-                
-                # Parse timestamp: "00:00:01,234 --> 00:00:04,567"
-                if ' --> ' in timestamp_line:
-                    start_str, end_str = timestamp_line.split(' --> ')
-                    start_seconds = self._srt_time_to_seconds(start_str)
-                    end_seconds = self._srt_time_to_seconds(end_str)
-                    
-                    segments.append({
-                        'start': start_seconds,
-                        'end': end_seconds,
-                        'text': text.strip()
-                    })
-        
-        return segments
+        content = await run_in_thread(Path(srt_file).read_text, encoding='utf-8')
+        
+        # Single scan over the file instead of splitting it into blocks and lines
+        return [
+            {
+                'start': self._srt_time_to_seconds(match[1]),
+                'end': self._srt_time_to_seconds(match[2]),
+                'text': match[3].replace('\n', ' ').strip()
+            }
+            for match in _SRT_CUE_RE.finditer(content)
+        ]
     
     def _srt_time_to_seconds(self, time_str: str) -> float:
         """Convert SRT timestamp format (HH:MM:SS,mmm) to seconds."""
         try:
-            # Format: "00:01:23,456"
-            time_part, milliseconds = time_str.split(',')
-            hours, minutes, seconds = map(int, time_part.split(':'))
+            # Format: "00:01:23,456", parsed from the right since hours may exceed two digits
+            hours = int(time_str[:-10])
+            minutes = int(time_str[-9:-7])
+            seconds = int(time_str[-6:-4])
+            milliseconds = int(time_str[-3:])
             
-            total_seconds = hours * 3600 + minutes * 60 + seconds + int(milliseconds) / 1000.0
-            return total_seconds
+            return (((hours * 60 + minutes) * 60 + seconds) * 1000 + milliseconds) / 1000
         except:
             return 0.0
     
-    async def transcribe_audio_with_timestamps(self, audio_file: str, language: str = "auto") -> Tuple[str, str, list]:
-        """Transcribe audio and return text, language, and segments with timestamps."""
+    async def transcribe_audio_with_timestamps(self, audio_file: str, language: str = "auto", duration: Optional[float] = None) -> Tuple[str, str, list]:
+        """Transcribe audio and return text, language, and segments with timestamps.
+
+        ``duration`` is the already probed audio length, reused by the
+        estimated-timestamps fallback instead of probing the file again
+        (a failed probe yields 0.0, which triggers a new probe).
+        """
         
         # 1st priority: Try whisper.cpp with timestamps
         if self.whisper_cpp_available:
@@ -459,7 +685,8 @@ class AudioService:
         segments = []
         
         # Estimate duration per segment
-        duration = await self._get_audio_duration(audio_file)
+        if not duration:
+            duration = await self._get_audio_duration(audio_file)
         if len(lines) > 0:
             segment_duration = duration / len(lines)
             
@@ -491,22 +718,24 @@ class AudioService:
             # Save uploaded file
             audio_file, duration = await self.save_uploaded_file(file)
             
-            # Transcribe audio with or without timestamps
-            if output_format == "srt":
-                transcription, detected_language, segments = await self.transcribe_audio_with_timestamps(audio_file, language)
-                formatted_output = self._format_srt_timestamps(segments)
-            else:
-                transcription, detected_language = await self.transcribe_audio(audio_file, language)
-                formatted_output = transcription
-            
+            return await self._transcribe_prepared_file(audio_file, duration, file.filename, language, output_format)
+        except Exception as e:
             return {
-                "transcription": formatted_output,
-                "duration": duration,
-                "language": detected_language,
-                "output_format": output_format,
-                "filename": file.filename,
-                "success": True
+                "error": str(e),
+                "success": False
             }
+        finally:
+            # Clean up temporary file
+            if audio_file:
+                await self.cleanup_temp_file(audio_file)
+    
+    async def process_audio_path(self, upload_path: str, filename: Optional[str], language: str = "auto", output_format: str = "txt") -> dict:
+        """Complete pipeline for an upload already streamed to disk at upload_path."""
+        audio_file = None
+        try:
+            audio_file, duration = await self.prepare_audio_file(upload_path)
+            
+            return await self._transcribe_prepared_file(audio_file, duration, filename, language, output_format)
         except Exception as e:
             return {
                 "error": str(e),
@@ -515,4 +744,23 @@ class AudioService:
         finally:
             # Clean up temporary file
             if audio_file:
-                await self.cleanup_temp_file(audio_file)
\ No newline at end of file
+                await self.cleanup_temp_file(audio_file)
+    
+    async def _transcribe_prepared_file(self, audio_file: str, duration: float, filename: Optional[str], language: str, output_format: str) -> dict:
+        """Transcribe a prepared WAV file and build the pipeline result."""
+        # Transcribe audio with or without timestamps
+        if output_format == "srt":
+            transcription, detected_language, segments = await self.transcribe_audio_with_timestamps(audio_file, language, duration)
+            formatted_output = self._format_srt_timestamps(segments)
+        else:
+            transcription, detected_language = await self.transcribe_audio(audio_file, language)
+            formatted_output = transcription
+        
+        return {
+            "transcription": formatted_output,
+            "duration": duration,
+            "language": detected_language,
+            "output_format": output_format,
+            "filename": filename,
+            "success": True
+        }
@@ -0,0 +1,158 @@
+import os
+import asyncio
+import functools
+import logging
+import math
+import multiprocessing
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Executors shared by all services of this worker process. They are created by
+# the application lifespan; until then the helpers fall back to the event
+# loop's default thread pool so services keep working outside the app.
+_process_pool: Optional[ProcessPoolExecutor] = None
+_thread_pool: Optional[ThreadPoolExecutor] = None
+
+# subprocess.Popen only spawns children with posix_spawn (vfork: constant cost
+# whatever the parent's RSS) instead of fork+exec when close_fds is off and no
+# preexec_fn, pass_fds, cwd or session options are given; the executable must
+# also be a path, not a bare name. This applies to whisper_server's Popen and
+# to asyncio subprocesses on the stdlib event loop. Under uvloop (the
+# Gunicorn UvloopWorker and the dev server) asyncio subprocesses are started
+# by libuv's uv_spawn instead, which the option does not change. Descriptors
+# opened by Python are non-inheritable (PEP 446), so keeping close_fds off
+# leaks nothing either way.
+SPAWN_KWARGS = {"close_fds": False}
+
+
+@functools.lru_cache(maxsize=1)
+def available_cpus() -> int:
+    """Number of CPUs this process may use.
+
+    os.cpu_count() reports the host's CPUs even inside a container; this takes
+    the affinity mask (cpusets) and the cgroup CPU quota (e.g. compose's
+    cpus: '2.0') into account.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    
+    quota, period = None, None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            fields = f.read().split()
+        if fields[0] != "max":
+            quota, period = int(fields[0]), int(fields[1])
+    except (OSError, ValueError, IndexError):
+        try:
+            # cgroup v1: a quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                quota = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+        except (OSError, ValueError):
+            pass
+    
+    if quota and period and quota > 0:
+        cpus = min(cpus, math.ceil(quota / period))
+    return max(1, cpus)
+
+
+def _init_process_worker():
+    """Initialize a transcription worker process."""
+    logging.basicConfig(level=logging.INFO)
+
+
+def transcription_processes() -> int:
+    """Size of this worker's transcription process pool.
+
+    Each pool process holds its own Whisper model, so the cores are one budget
+    for the whole container: by default they are split between the Gunicorn
+    workers (WORKERS, exported by gunicorn_conf), at least one process each.
+    TRANSCRIPTION_PROCESSES sets the size directly.
+    """
+    if os.environ.get("TRANSCRIPTION_PROCESSES"):
+        return max(1, int(os.environ["TRANSCRIPTION_PROCESSES"]))
+    workers = max(1, int(os.environ.get("WORKERS") or 1))
+    return max(1, available_cpus() // workers)
+
+
+def start_pools() -> ProcessPoolExecutor:
+    """Create the process pool for CPU-bound work and the thread pool for blocking calls."""
+    global _process_pool, _thread_pool
+
+    if _process_pool is None:
+        max_processes = transcription_processes()
+        # spawn instead of fork: the parent runs an event loop and other threads
+        _process_pool = ProcessPoolExecutor(
+            max_workers=max_processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_process_worker
+        )
+        logger.info(f"⚙️ Pool de processos para transcrição criado ({max_processes} processos)")
+
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(
+            max_workers=max(4, (os.cpu_count() or 1) * 2),
+            thread_name_prefix="subprocess"
+        )
+
+    return _process_pool
+
+
+def shutdown_pools():
+    """Shut down the shared executors."""
+    global _process_pool, _thread_pool
+
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=True, cancel_futures=True)
+        _thread_pool = None
+
+
+async def run_in_process(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a picklable module-level function in the transcription process pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_process_pool, func, *args)
+
+
+async def run_in_thread(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking call (e.g. yt-dlp) in the shared thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_thread_pool, functools.partial(func, *args, **kwargs))
+
+
+async def run_process(cmd: Sequence[str], timeout: float, env: Optional[dict] = None, check: bool = False) -> subprocess.CompletedProcess:
+    """Run cmd as an asyncio subprocess, like subprocess.run(capture_output=True).
+
+    stdout and stderr are returned as bytes. Mirrors subprocess.run errors:
+    TimeoutExpired after killing the process, and CalledProcessError (with
+    decoded stderr) on a non-zero exit when check is set.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+        **SPAWN_KWARGS
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except BaseException as e:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        if isinstance(e, asyncio.TimeoutError):
+            raise subprocess.TimeoutExpired(cmd, timeout) from None
+        raise
+    
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, cmd, output=stdout, stderr=stderr.decode(errors='replace'))
+    return subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
@@ -3,10 +3,10 @@ import tempfile
 import subprocess
 import logging
 import shutil
-from typing import Tuple
-import aiofiles
+from typing import Tuple, Optional
 from fastapi import UploadFile
-from .audio_service import AudioService
+from .audio_service import AudioService, NON_PIPEABLE_EXTENSIONS, probe_duration, resolve_binaries, save_upload_to_path
+from .executors import run_process
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -22,17 +22,8 @@ class VideoService:
     
     def _check_dependencies(self):
         """Check if required dependencies are available."""
-        # Use the same FFmpeg setup as AudioService
-        backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ffmpeg_dir = os.path.join(backend_root, 'tools', 'ffmpeg')
-        self.ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
-        
-        # Check if local FFmpeg binaries exist and are executable
-        if os.path.exists(self.ffmpeg_path) and os.access(self.ffmpeg_path, os.X_OK):
-            logger.info(f"✅ FFmpeg local encontrado para extração de áudio: {self.ffmpeg_path}")
-        else:
-            logger.warning(f"⚠️ FFmpeg local não encontrado: {self.ffmpeg_path}")
-            self.ffmpeg_path = None
+        # Only the local FFmpeg build is used for audio extraction
+        self.ffmpeg_path = resolve_binaries().local_ffmpeg_path
     
     async def save_uploaded_video(self, file: UploadFile) -> Tuple[str, float]:
         """Save uploaded video file and return filepath and duration."""
@@ -49,9 +40,7 @@ class VideoService:
         temp_file_path = os.path.join(temp_dir, f"uploaded_video{ext}")
         
         try:
-            async with aiofiles.open(temp_file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+            await save_upload_to_path(file, temp_file_path)
             
             logger.info(f"📁 Vídeo salvo: {temp_file_path}")
             
@@ -65,6 +54,30 @@ class VideoService:
             self._cleanup_temp_dir(temp_dir)
             raise Exception(f"Erro ao processar arquivo de vídeo: {str(e)}")
     
+    async def extract_audio_from_upload(self, file: UploadFile) -> Optional[Tuple[str, float]]:
+        """Pipe an uploaded video straight into FFmpeg and return the WAV path and duration.
+
+        The video itself is never written to disk. Returns None when the
+        container cannot be read from a pipe or the conversion fails, so the
+        caller can fall back to saving the video first.
+        """
+        ext = os.path.splitext(file.filename or '')[1].lower()
+        if not self.audio_service.ffmpeg_path or ext in NON_PIPEABLE_EXTENSIONS:
+            return None
+        
+        temp_dir = tempfile.mkdtemp()
+        audio_file = os.path.join(temp_dir, "uploaded_video_extracted.wav")
+        
+        try:
+            logger.info(f"🎵 Extraindo áudio do vídeo via pipe: {file.filename}")
+            await self.audio_service.stream_upload_to_wav(file, audio_file)
+            return audio_file, self.audio_service.get_wav_duration(audio_file)
+        except Exception as e:
+            logger.warning(f"⚠️ Extração via pipe falhou, salvando vídeo original: {e}")
+            self._cleanup_temp_dir(temp_dir)
+            await file.seek(0)
+            return None
+    
     async def _get_video_duration(self, video_file: str) -> float:
         """Get video file duration using FFprobe."""
         if not self.ffmpeg_path:
@@ -76,14 +89,7 @@ class VideoService:
             if not os.path.exists(ffprobe_path):
                 ffprobe_path = self.ffmpeg_path  # fallback to ffmpeg
             
-            cmd = [
-                ffprobe_path, "-v", "quiet", "-show_entries", 
-                "format=duration", "-of", "csv=p=0", video_file
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            if result.returncode == 0:
-                return float(result.stdout.strip())
+            return await probe_duration(ffprobe_path, video_file)
         except Exception as e:
             logger.warning(f"⚠️ Erro ao obter duração do vídeo: {e}")
         
@@ -109,14 +115,15 @@ class VideoService:
             ]
             
             logger.info(f"🎵 Extraindo áudio do vídeo: {video_file}")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+            result = await run_process(cmd, timeout=300)
             
             if result.returncode == 0:
                 logger.info(f"✅ Áudio extraído com sucesso: {audio_file}")
                 return audio_file
             else:
-                logger.error(f"❌ Erro na extração de áudio: {result.stderr}")
-                raise Exception(f"Erro na extração de áudio: {result.stderr}")
+                stderr = result.stderr.decode(errors='replace')
+                logger.error(f"❌ Erro na extração de áudio: {stderr}")
+                raise Exception(f"Erro na extração de áudio: {stderr}")
                 
         except Exception as e:
             logger.error(f"❌ Erro na extração de áudio: {e}")
@@ -145,28 +152,34 @@ class VideoService:
         audio_file = None
         
         try:
+            # Extract audio while reading the upload when the container allows it
+            extracted = await self.extract_audio_from_upload(file)
+            if extracted:
+                audio_file, duration = extracted
+                return await self._transcribe_extracted_audio(audio_file, duration, file.filename, language, output_format)
+            
             # Save uploaded video file
             video_file, duration = await self.save_uploaded_video(file)
             
-            # Extract audio from video
-            audio_file = await self.extract_audio_from_video(video_file)
-            
-            # Use AudioService to transcribe the extracted audio
-            if output_format == "srt":
-                transcription, detected_language, segments = await self.audio_service.transcribe_audio_with_timestamps(audio_file, language)
-                formatted_output = self.audio_service._format_srt_timestamps(segments)
-            else:
-                transcription, detected_language = await self.audio_service.transcribe_audio(audio_file, language)
-                formatted_output = transcription
-            
+            return await self._transcribe_saved_video(video_file, duration, file.filename, language, output_format)
+        except Exception as e:
             return {
-                "transcription": formatted_output,
-                "duration": duration,
-                "language": detected_language,
-                "output_format": output_format,
-                "filename": file.filename,
-                "success": True
+                "error": str(e),
+                "success": False
             }
+        finally:
+            # Clean up temporary files
+            if video_file:
+                await self.cleanup_temp_file(video_file)
+            if audio_file:
+                await self.cleanup_temp_file(audio_file)
+    
+    async def process_video_path(self, video_file: str, filename: Optional[str], language: str = "auto", output_format: str = "txt") -> dict:
+        """Complete pipeline for a video already streamed to disk at video_file."""
+        try:
+            duration = await self._get_video_duration(video_file)
+            
+            return await self._transcribe_saved_video(video_file, duration, filename, language, output_format)
         except Exception as e:
             return {
                 "error": str(e),
@@ -174,10 +187,39 @@ class VideoService:
             }
         finally:
             # Clean up temporary files
+            await self.cleanup_temp_file(video_file)
+    
+    async def _transcribe_saved_video(self, video_file: str, duration: float, filename: Optional[str], language: str, output_format: str) -> dict:
+        """Extract audio from a saved video and transcribe it."""
+        audio_file = None
+        
+        try:
+            # Extract audio from video
+            audio_file = await self.extract_audio_from_video(video_file)
+            
+            return await self._transcribe_extracted_audio(audio_file, duration, filename, language, output_format)
+        finally:
             if audio_file and os.path.exists(audio_file):
                 try:
                     os.remove(audio_file)
                 except Exception:
                     pass
-            if video_file:
-                await self.cleanup_temp_file(video_file)
\ No newline at end of file
+    
+    async def _transcribe_extracted_audio(self, audio_file: str, duration: float, filename: Optional[str], language: str, output_format: str) -> dict:
+        """Transcribe audio extracted from a video and build the result."""
+        # Use AudioService to transcribe the extracted audio
+        if output_format == "srt":
+            transcription, detected_language, segments = await self.audio_service.transcribe_audio_with_timestamps(audio_file, language, duration)
+            formatted_output = self.audio_service._format_srt_timestamps(segments)
+        else:
+            transcription, detected_language = await self.audio_service.transcribe_audio(audio_file, language)
+            formatted_output = transcription
+        
+        return {
+            "transcription": formatted_output,
+            "duration": duration,
+            "language": detected_language,
+            "output_format": output_format,
+            "filename": filename,
+            "success": True
+        }
@@ -1,28 +1,435 @@
 import os
+import asyncio
+import functools
 import subprocess
 import logging
+import importlib.util
 from typing import Tuple, Optional
+from .executors import available_cpus, run_in_process, transcription_processes
 
 logger = logging.getLogger(__name__)
 
+# With openai-whisper, concurrent plain transcriptions arriving within
+# WHISPER_BATCH_WINDOW_MS are sent to the process pool together, up to
+# WHISPER_BATCH_SIZE per batch
+WHISPER_BATCH_SIZE = max(1, int(os.environ.get("WHISPER_BATCH_SIZE", "8")))
+WHISPER_BATCH_WINDOW = int(os.environ.get("WHISPER_BATCH_WINDOW_MS", "20")) / 1000
+
+# faster-whisper (CTranslate2, int8) is preferred; openai-whisper is the fallback.
+# Checked without importing, so the API process never loads torch or ctranslate2.
+FASTER_WHISPER_AVAILABLE = importlib.util.find_spec("faster_whisper") is not None
+
+# Model used by both backends. base is multilingual and fast on CPU; with
+# faster-whisper, distilled models (e.g. distil-small.en, English only) or
+# large-v3-turbo trade differently between speed and accuracy.
+WHISPER_PYTHON_MODEL = os.environ.get("WHISPER_PYTHON_MODEL", "base").strip()
+
+# faster-whisper splits each file into voice-activity segments and decodes up
+# to WHISPER_SEGMENT_BATCH_SIZE of them per batch (0 = sequential transcription)
+WHISPER_SEGMENT_BATCH_SIZE = int(os.environ.get("WHISPER_SEGMENT_BATCH_SIZE", "8"))
+
+
+@functools.lru_cache(maxsize=1)
+def _ensure_ffmpeg_in_path():
+    """Ensure local FFmpeg is available in PATH (checked once per process)."""
+    # Check if we have local FFmpeg
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    ffmpeg_dir = os.path.join(project_root, 'tools', 'ffmpeg')
+    ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
+    
+    if os.path.exists(ffmpeg_path) and os.access(ffmpeg_path, os.X_OK):
+        # Add to PATH if not already there
+        current_path = os.environ.get('PATH', '')
+        if ffmpeg_dir not in current_path:
+            os.environ['PATH'] = f"{ffmpeg_dir}:{current_path}"
+            logger.info(f"🔧 FFmpeg local adicionado ao PATH para Whisper: {ffmpeg_dir}")
+    else:
+        logger.warning(f"⚠️ FFmpeg local não encontrado para Whisper: {ffmpeg_path}")
+
+
+def _intra_op_threads() -> int:
+    """Threads each pool process gives the model's matmul kernels.
+
+    torch and CTranslate2 default to every core in every process, so the
+    cores are split between all transcription processes of the container
+    (the pool of each Gunicorn worker); WHISPER_PYTHON_THREADS sets the
+    count directly.
+    """
+    if os.environ.get("WHISPER_PYTHON_THREADS"):
+        return max(1, int(os.environ["WHISPER_PYTHON_THREADS"]))
+    workers = max(1, int(os.environ.get("WORKERS") or 1))
+    return max(1, available_cpus() // (transcription_processes() * workers))
+
+
+def _load_audio(audio_file: str):
+    """Decode audio_file to 16kHz mono float32 samples in-process with PyAV.
+
+    whisper.load_audio pipes the file through an ffmpeg subprocess; PyAV links
+    the same libraries, so the decode skips the fork/exec and the pipe copy.
+    """
+    import numpy as np
+    try:
+        import av
+    except ImportError:
+        import whisper
+        return whisper.load_audio(audio_file)
+    
+    resampler = av.AudioResampler(format="flt", layout="mono", rate=16000)
+    chunks = []
+    with av.open(audio_file) as container:
+        for frame in container.decode(audio=0):
+            frame.pts = None
+            for resampled in resampler.resample(frame):
+                chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+    
+    if not chunks:
+        return np.zeros(0, dtype=np.float32)
+    return np.concatenate(chunks)
+
+
+# Models loaded by this process, keyed by (model name, device). Each pool
+# process runs one transcription at a time, so loading needs no lock.
+_MODEL_CACHE: dict = {}
+
+
+def _install_preallocated_kv_cache_hooks(model, cache: Optional[dict] = None):
+    """Drop-in for Whisper.install_kv_cache_hooks that appends keys/values in place.
+
+    The stock hooks torch.cat every new token onto the cache, reallocating and
+    copying all previous keys/values per step. Here each projection gets one
+    (batch, n_text_ctx, n_state) buffer and the cache holds a growing view of it.
+    A cache entry replaced by beam search reordering is copied into a new buffer.
+    """
+    import torch
+    from whisper.model import MultiHeadAttention
+    
+    cache = {**cache} if cache is not None else {}
+    buffers = {}
+    hooks = []
+    n_text_ctx = model.dims.n_text_ctx
+    
+    def save_to_cache(module, _, output):
+        if output.shape[1] > n_text_ctx:
+            # cross attention over the audio features, computed once
+            cache[module] = output
+            return output
+        
+        previous = cache.get(module)
+        state = buffers.get(module)
+        if state is not None and previous is state[2]:
+            buffer, length = state[0], state[1]
+        else:
+            buffer = output.new_empty((output.shape[0], n_text_ctx, output.shape[2]))
+            length = 0
+            if previous is not None:
+                buffer[:, :previous.shape[1]] = previous
+                length = previous.shape[1]
+        
+        end = length + output.shape[1]
+        if end > n_text_ctx:
+            cache[module] = torch.cat([previous, output], dim=1).detach()
+            buffers.pop(module, None)
+            return cache[module]
+        
+        buffer[:, length:end] = output.detach()
+        view = buffer[:, :end]
+        buffers[module] = (buffer, end, view)
+        cache[module] = view
+        return view
+    
+    def install_hooks(layer):
+        if isinstance(layer, MultiHeadAttention):
+            hooks.append(layer.key.register_forward_hook(save_to_cache))
+            hooks.append(layer.value.register_forward_hook(save_to_cache))
+    
+    model.decoder.apply(install_hooks)
+    return cache, hooks
+
+
+def _load_model(model_name: str = "base"):
+    """Return the cached Whisper model, loading it on first use.
+
+    On CPU the Linear layers are dynamically quantized to int8, which speeds
+    up the memory-bound decoder with minimal accuracy loss. On CUDA the
+    weights are stored in fp16 to match the fp16 activations of decoding.
+    """
+    import torch
+    import whisper
+    
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = _MODEL_CACHE.get((model_name, device))
+    if model is None:
+        torch.set_num_threads(_intra_op_threads())
+        # Whisper's graph has no independent ops to run side by side, so
+        # inter-op threads would only contend with the matmul threads
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # Already set, or parallel work has started in this process
+        logger.info(f"🤖 Carregando modelo Whisper {model_name} ({device})...")
+        model = whisper.load_model(model_name, device=device)
+        if device == "cpu":
+            # whisper.model.Linear only adds dtype casts for fp16; as plain
+            # nn.Linear the layers are picked up by quantize_dynamic
+            for module in model.modules():
+                if isinstance(module, whisper.model.Linear):
+                    module.__class__ = torch.nn.Linear
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        else:
+            # Otherwise every Linear/Conv1d casts its fp32 weights to fp16 on
+            # each forward pass; LayerNorm stays fp32 as Whisper expects
+            for module in model.modules():
+                if isinstance(module, (torch.nn.Linear, torch.nn.Conv1d, torch.nn.Embedding)):
+                    module.half()
+        model.install_kv_cache_hooks = functools.partial(_install_preallocated_kv_cache_hooks, model)
+        _MODEL_CACHE[(model_name, device)] = model
+    return model
+
+
+def _load_faster_model(model_name: str = "base"):
+    """Return the cached faster-whisper model with int8 weights, loading it on first use."""
+    model = _MODEL_CACHE.get(("faster-whisper", model_name))
+    if model is None:
+        import ctranslate2
+        from faster_whisper import WhisperModel
+        
+        # int8 weights everywhere; on GPU with fp16 instead of fp32 activations
+        compute_type = "int8_float16" if ctranslate2.get_cuda_device_count() > 0 else "int8"
+        logger.info(f"🤖 Carregando modelo faster-whisper {model_name} ({compute_type})...")
+        model = WhisperModel(model_name, device="auto", compute_type=compute_type, cpu_threads=_intra_op_threads())
+        _MODEL_CACHE[("faster-whisper", model_name)] = model
+    return model
+
+
+def _run_transcribe(audio_file, language: Optional[str], word_timestamps: bool) -> dict:
+    """Transcribe audio_file (a path or decoded samples) with the cached Whisper model.
+
+    Runs inside the transcription process pool, so it must stay a picklable
+    module-level function and return plain data.
+    """
+    # Ensure local FFmpeg is in PATH if available
+    _ensure_ffmpeg_in_path()
+    
+    if FASTER_WHISPER_AVAILABLE:
+        model = _load_faster_model(WHISPER_PYTHON_MODEL)
+        if WHISPER_SEGMENT_BATCH_SIZE > 0:
+            from faster_whisper import BatchedInferencePipeline
+            
+            # Silero VAD cuts the audio into speech segments of up to 30s,
+            # which are encoded and decoded side by side. The pipeline skips
+            # timestamp tokens by default, leaving one segment per 30s chunk;
+            # the timestamped (SRT) path needs them for sentence-level cues
+            segments, info = BatchedInferencePipeline(model).transcribe(
+                audio_file,
+                language=language,
+                batch_size=WHISPER_SEGMENT_BATCH_SIZE,
+                without_timestamps=not word_timestamps,
+                word_timestamps=word_timestamps
+            )
+        else:
+            # The VAD filter lets the decoder skip silent stretches
+            segments, info = model.transcribe(
+                audio_file,
+                language=language,
+                vad_filter=True,
+                word_timestamps=word_timestamps
+            )
+        segments = list(segments)
+        
+        return {
+            "text": "".join(segment.text for segment in segments),
+            "language": info.language,
+            "segments": [
+                {
+                    'start': segment.start,
+                    'end': segment.end,
+                    'text': segment.text
+                }
+                for segment in segments
+            ]
+        }
+    
+    # Modelo base por padrão: bom equilíbrio entre velocidade e qualidade
+    model = _load_model(WHISPER_PYTHON_MODEL)
+    
+    audio = _load_audio(audio_file) if isinstance(audio_file, str) else audio_file
+    if model.device.type == "cuda":
+        import torch
+        
+        # Samples on the GPU make the STFT and log-mel run there too, and
+        # only the raw audio (not the 80x larger spectrogram) is copied
+        audio = torch.from_numpy(audio).to(model.device)
+    result = model.transcribe(
+        audio,
+        language=language,
+        fp16=model.device.type == "cuda",
+        verbose=False,
+        word_timestamps=word_timestamps
+    )
+    
+    return {
+        "text": result["text"],
+        "language": result.get("language"),
+        "segments": [
+            {
+                'start': segment.get('start', 0),
+                'end': segment.get('end', 0),
+                'text': segment.get('text', '')
+            }
+            for segment in result.get("segments", [])
+        ]
+    }
+
+
+
+def _run_transcribe_batch(items: list) -> list:
+    """Transcribe several (audio_file, language) items with one model pass.
+
+    Only used with openai-whisper: clips of up to 30 seconds share a single
+    batched encoder/decoder call per language setting; longer files, and clips
+    whose batched result would have triggered Whisper's temperature fallback,
+    go through model.transcribe.
+    Runs inside the transcription process pool like _run_transcribe. An item
+    that fails (e.g. an undecodable upload) gets its exception in its result
+    slot, so it does not fail the other requests of the batch.
+    """
+    def transcribe_one(audio, language):
+        try:
+            return _run_transcribe(audio, language, False)
+        except Exception as e:
+            return e
+    
+    if len(items) == 1:
+        return [transcribe_one(audio_file, language) for audio_file, language in items]
+    
+    import torch
+    import whisper
+    
+    _ensure_ffmpeg_in_path()
+    model = _load_model(WHISPER_PYTHON_MODEL)
+    
+    results = [None] * len(items)
+    batches = {}
+    for index, (audio_file, language) in enumerate(items):
+        try:
+            audio = _load_audio(audio_file)
+        except Exception as e:
+            results[index] = e
+            continue
+        if audio.shape[-1] > whisper.audio.N_SAMPLES:
+            results[index] = transcribe_one(audio, language)
+        else:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels, device=model.device)
+            batches.setdefault(language, []).append((index, audio, mel))
+    
+    for language, entries in batches.items():
+        options = whisper.DecodingOptions(
+            language=language,
+            without_timestamps=True,
+            fp16=model.device.type == "cuda"
+        )
+        mel_batch = torch.stack([mel for _, _, mel in entries])
+        for (index, audio, _), decoded in zip(entries, whisper.decode(model, mel_batch, options)):
+            # Same thresholds model.transcribe uses for silence and fallback
+            if decoded.no_speech_prob > 0.6 and decoded.avg_logprob <= -1.0:
+                results[index] = {"text": "", "language": decoded.language, "segments": []}
+            elif decoded.compression_ratio > 2.4 or decoded.avg_logprob < -1.0:
+                results[index] = transcribe_one(audio, items[index][1])
+            else:
+                results[index] = {"text": decoded.text, "language": decoded.language, "segments": []}
+    
+    return results
+
+
+class _TranscriptionBatcher:
+    """Collect concurrent transcriptions into micro-batches for the process pool."""
+    
+    def __init__(self, max_batch: int, window: float):
+        self.max_batch = max_batch
+        self.window = window
+        self._loop = None
+        self._queue = None
+        self._worker = None
+        self._dispatches = set()
+    
+    async def submit(self, audio_file: str, language: Optional[str]) -> dict:
+        """Queue one transcription and wait for the result of its batch."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._collect())
+        
+        future = loop.create_future()
+        await self._queue.put((audio_file, language, future))
+        return await future
+    
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            
+            # Keep collecting the next batch while this one runs
+            task = loop.create_task(self._dispatch(batch))
+            self._dispatches.add(task)
+            task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, batch: list):
+        pending = [entry for entry in batch if not entry[2].done()]
+        if not pending:
+            return
+        if len(pending) > 1:
+            logger.info(f"📦 Transcrevendo {len(pending)} áudios em um único lote")
+        try:
+            results = await run_in_process(_run_transcribe_batch, [(audio_file, language) for audio_file, language, _ in pending])
+        except Exception as e:
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, _, future), result in zip(pending, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+_batcher = _TranscriptionBatcher(WHISPER_BATCH_SIZE, WHISPER_BATCH_WINDOW)
+
+
 class WhisperPythonService:
-    """Alternative service using OpenAI Whisper Python library."""
+    """Alternative service using faster-whisper or the OpenAI Whisper Python library."""
     
     def __init__(self):
         self._check_whisper()
     
     def _check_whisper(self):
-        """Check if OpenAI Whisper is available."""
-        try:
-            import whisper
+        """Check if faster-whisper or OpenAI Whisper is available without importing it (and torch)."""
+        if FASTER_WHISPER_AVAILABLE:
+            logger.info("✅ faster-whisper encontrado (CTranslate2 int8)")
+            self.whisper_available = True
+        elif importlib.util.find_spec("whisper") is not None:
             logger.info("✅ OpenAI Whisper encontrado")
             self.whisper_available = True
-        except ImportError:
-            logger.warning("❌ OpenAI Whisper não encontrado. Execute: pip install openai-whisper")
+        else:
+            logger.warning("❌ OpenAI Whisper não encontrado. Execute: pip install faster-whisper (ou openai-whisper)")
             self.whisper_available = False
     
     async def transcribe_audio(self, audio_file: str, language: str = "auto") -> Tuple[str, str]:
-        """Transcribe audio using OpenAI Whisper Python library."""
+        """Transcribe audio using faster-whisper or the OpenAI Whisper Python library."""
         if not self.whisper_available:
             try:
                 import whisper
@@ -31,30 +438,22 @@ class WhisperPythonService:
                 raise Exception("OpenAI Whisper não está instalado. Execute: pip install openai-whisper")
         
         try:
-            import whisper
-            
-            # Ensure local FFmpeg is in PATH if available
-            self._ensure_ffmpeg_in_path()
-            
-            logger.info(f"🤖 Carregando modelo Whisper...")
-            
-            # Use o modelo base para um bom equilíbrio entre velocidade e qualidade
-            model = whisper.load_model("base")
-            
             # Configurar idioma
             language_param = None if language == "auto" else language
             
             logger.info(f"🎤 Transcrevendo áudio: {os.path.basename(audio_file)}")
             
-            # Transcrever
-            result = model.transcribe(
-                audio_file,
-                language=language_param,
-                verbose=False
-            )
+            # Transcrever em um processo separado. faster-whisper already batches
+            # the segments of each file, so each request is its own pool job and
+            # concurrent requests spread over the pool; openai-whisper groups
+            # concurrent short clips into one batched decode
+            if FASTER_WHISPER_AVAILABLE:
+                result = await run_in_process(_run_transcribe, audio_file, language_param, False)
+            else:
+                result = await _batcher.submit(audio_file, language_param)
             
             transcription = result["text"].strip()
-            detected_language = result.get("language", language)
+            detected_language = result["language"] or language
             
             logger.info(f"✅ Transcrição concluída. Idioma detectado: {detected_language}")
             logger.info(f"📝 Preview: {transcription[:100]}...")
@@ -66,7 +465,7 @@ class WhisperPythonService:
             raise Exception(f"Erro na transcrição com OpenAI Whisper: {str(e)}")
     
     async def transcribe_audio_with_timestamps(self, audio_file: str, language: str = "auto") -> Tuple[str, str, list]:
-        """Transcribe audio with timestamps using OpenAI Whisper Python library."""
+        """Transcribe audio with timestamps using faster-whisper or the OpenAI Whisper Python library."""
         if not self.whisper_available:
             try:
                 import whisper
@@ -75,43 +474,27 @@ class WhisperPythonService:
                 raise Exception("OpenAI Whisper não está instalado. Execute: pip install openai-whisper")
         
         try:
-            import whisper
-            
-            # Ensure local FFmpeg is in PATH if available
-            self._ensure_ffmpeg_in_path()
-            
-            logger.info(f"🤖 Carregando modelo Whisper para transcrição com timestamps...")
-            
-            # Use o modelo base para um bom equilíbrio entre velocidade e qualidade
-            model = whisper.load_model("base")
-            
             # Configurar idioma
             language_param = None if language == "auto" else language
             
             logger.info(f"🎤 Transcrevendo áudio com timestamps: {os.path.basename(audio_file)}")
             
-            # Transcrever com word_timestamps ativado
-            result = model.transcribe(
-                audio_file,
-                language=language_param,
-                verbose=False,
-                word_timestamps=True
-            )
+            # Transcrever com word_timestamps ativado, em um processo separado
+            result = await run_in_process(_run_transcribe, audio_file, language_param, True)
             
             transcription = result["text"].strip()
-            detected_language = result.get("language", language)
+            detected_language = result["language"] or language
             
             # Extrair segmentos com timestamps
             segments = []
-            if "segments" in result:
-                for segment in result["segments"]:
-                    text = segment.get("text", "").strip()
-                    if text:
-                        segments.append({
-                            'start': segment.get('start', 0),
-                            'end': segment.get('end', 0),
-                            'text': text
-                        })
+            for segment in result["segments"]:
+                text = segment["text"].strip()
+                if text:
+                    segments.append({
+                        'start': segment['start'],
+                        'end': segment['end'],
+                        'text': text
+                    })
             
             logger.info(f"✅ Transcrição com timestamps concluída. Idioma detectado: {detected_language}")
             logger.info(f"📝 Preview: {transcription[:100]}...")
@@ -121,21 +504,3 @@ class WhisperPythonService:
         except Exception as e:
             logger.error(f"❌ Erro na transcrição com timestamps: {e}")
             raise Exception(f"Erro na transcrição com OpenAI Whisper: {str(e)}")
-    
-    def _ensure_ffmpeg_in_path(self):
-        """Ensure local FFmpeg is available in PATH."""
-        import os
-        
-        # Check if we have local FFmpeg
-        project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        ffmpeg_dir = os.path.join(project_root, 'tools', 'ffmpeg')
-        ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
-        
-        if os.path.exists(ffmpeg_path) and os.access(ffmpeg_path, os.X_OK):
-            # Add to PATH if not already there
-            current_path = os.environ.get('PATH', '')
-            if ffmpeg_dir not in current_path:
-                os.environ['PATH'] = f"{ffmpeg_dir}:{current_path}"
-                logger.info(f"🔧 FFmpeg local adicionado ao PATH para Whisper: {ffmpeg_dir}")
-        else:
-            logger.warning(f"⚠️ FFmpeg local não encontrado para Whisper: {ffmpeg_path}")
\ No newline at end of file
@@ -0,0 +1,200 @@
+import os
+import logging
+import socket
+import subprocess
+import time
+import orjson
+from pathlib import Path
+from typing import Optional, Tuple
+from .executors import SPAWN_KWARGS, run_in_thread
+from .whisper_languages import LANGUAGE_CODES
+
+# httpx is only needed to talk to whisper-server
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# A long-lived whisper.cpp server keeps the model mmapped and warm between
+# requests instead of loading it in every whisper-cli run. WHISPER_SERVER_URL
+# points at an external server; otherwise one shared server is launched.
+WHISPER_SERVER = os.environ.get("WHISPER_SERVER", "true").lower() == "true"
+WHISPER_SERVER_URL = os.environ.get("WHISPER_SERVER_URL", "").rstrip("/")
+WHISPER_SERVER_STARTUP_TIMEOUT = 60
+
+_process: Optional[subprocess.Popen] = None
+_client: Optional["httpx.AsyncClient"] = None
+
+
+def _server_binary(whisper_cpp_dir: str) -> Optional[str]:
+    """Return the whisper.cpp server binary (whisper-server, or server in older builds)."""
+    for name in ("whisper-server", "server"):
+        path = os.path.join(whisper_cpp_dir, name)
+        if os.path.exists(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def _free_port() -> int:
+    """Ask the kernel for an unused local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_listening(process: subprocess.Popen, port: int):
+    """Wait until whisper-server accepts connections (it listens after loading the model)."""
+    deadline = time.monotonic() + WHISPER_SERVER_STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise Exception(f"whisper-server encerrou com código {process.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise Exception("whisper-server não respondeu a tempo")
+
+
+def launch_server() -> Optional[subprocess.Popen]:
+    """Launch whisper-server and point WHISPER_SERVER_URL at it.
+
+    Under Gunicorn this runs once in the master (on_starting hook), so all
+    workers share one server, one resident model and all the cores given to
+    whisper.cpp. Returns None when no server should or could be launched.
+    """
+    global WHISPER_SERVER_URL
+
+    if not WHISPER_SERVER or WHISPER_SERVER_URL:
+        return None
+
+    backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    whisper_cpp_dir = os.path.join(backend_root, 'tools', 'whisper_cpp')
+    # Imported here because audio_service itself uses this module
+    from .audio_service import resolve_whisper_cpp_model, whisper_cpp_thread_args
+
+    binary = _server_binary(whisper_cpp_dir)
+    if binary is None:
+        logger.info("ℹ️ whisper-server não encontrado, usando whisper.cpp por requisição")
+        return None
+
+    port = _free_port()
+    env = os.environ.copy()
+    env['LD_LIBRARY_PATH'] = f"{whisper_cpp_dir}:{env.get('LD_LIBRARY_PATH', '')}"
+    cmd = [
+        binary, "-m", resolve_whisper_cpp_model(whisper_cpp_dir),
+        "--host", "127.0.0.1", "--port", str(port)
+    ] + whisper_cpp_thread_args(env)
+
+    # stderr is inherited so a failed launch shows up in the service logs
+    process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, env=env, **SPAWN_KWARGS)
+    try:
+        _wait_until_listening(process, port)
+    except Exception as e:
+        logger.warning(f"⚠️ Falha ao iniciar whisper-server: {e}")
+        stop_process(process)
+        return None
+
+    # Gunicorn workers are forked after this and inherit both
+    WHISPER_SERVER_URL = f"http://127.0.0.1:{port}"
+    os.environ["WHISPER_SERVER_URL"] = WHISPER_SERVER_URL
+    logger.info(f"✅ whisper-server iniciado em {WHISPER_SERVER_URL} (pid {process.pid})")
+    return process
+
+
+def stop_process(process: Optional[subprocess.Popen]):
+    """Terminate a whisper-server launched by launch_server."""
+    if process is None or process.poll() is not None:
+        return
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+async def start_server():
+    """Connect this worker to whisper-server, launching one if none is running.
+
+    With Gunicorn the master has already launched the shared server and set
+    WHISPER_SERVER_URL; a single uvicorn process launches its own.
+    """
+    global _process, _client
+
+    if not WHISPER_SERVER or _client is not None:
+        return
+    if not HTTPX_AVAILABLE:
+        logger.warning("⚠️ httpx não instalado, whisper-server desativado")
+        return
+
+    if not WHISPER_SERVER_URL:
+        if os.environ.get("WHISPER_SERVER_MANAGED") == "1":
+            # The Gunicorn master owns the server and could not start it;
+            # one server per worker is what it exists to avoid
+            logger.info("ℹ️ whisper-server compartilhado indisponível, usando whisper.cpp por requisição")
+            return
+        _process = await run_in_thread(launch_server)
+        if _process is None:
+            return
+
+    _client = httpx.AsyncClient(base_url=WHISPER_SERVER_URL, timeout=300)
+    logger.info(f"✅ whisper-server disponível em {WHISPER_SERVER_URL}")
+
+
+async def stop_server():
+    """Close the HTTP client and terminate the whisper-server this process launched."""
+    global _process, _client
+
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    if _process is not None:
+        await run_in_thread(stop_process, _process)
+        _process = None
+
+
+def is_available() -> bool:
+    """Whether transcriptions can be sent to whisper-server."""
+    return _client is not None and (_process is None or _process.poll() is None)
+
+
+async def transcribe(audio_file: str, language: str = "auto") -> Tuple[str, str, list]:
+    """Transcribe a 16kHz WAV file with whisper-server.
+
+    Returns the text, the detected language and the segments with timestamps.
+    """
+    # httpx reads file objects synchronously while sending, so the WAV is
+    # loaded in the thread pool instead of on the event loop
+    audio = await run_in_thread(Path(audio_file).read_bytes)
+    response = await _client.post(
+        "/inference",
+        files={'file': (os.path.basename(audio_file), audio, 'audio/wav')},
+        data={'response_format': 'verbose_json', 'language': language, 'temperature': '0.0'}
+    )
+    if response.status_code != 200:
+        raise Exception(f"whisper-server retornou {response.status_code}: {response.text[:500]}")
+
+    data = orjson.loads(response.content)
+    if 'error' in data:
+        raise Exception(f"whisper-server: {data['error']}")
+
+    segments = []
+    for segment in data.get('segments', []):
+        text = segment.get('text', '').strip()
+        if text:
+            segments.append({
+                'start': segment.get('start', 0),
+                'end': segment.get('end', 0),
+                'text': text
+            })
+
+    # whisper-server reports the full language name (e.g. "portuguese")
+    detected_language = language
+    if language == "auto" and data.get('language'):
+        detected_language = LANGUAGE_CODES.get(data['language'].lower(), data['language'])
+
+    return data.get('text', '').strip(), detected_language, segments
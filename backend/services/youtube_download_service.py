@@ -1,15 +1,88 @@
 import os
+import asyncio
+import glob
+import shutil
 import tempfile
 import subprocess
 import logging
-from typing import Tuple, Optional
+from functools import lru_cache
+from typing import List, Tuple, Optional, Union
 import yt_dlp
 import re
+from .executors import run_in_thread
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Characters not allowed in downloaded filenames, removed with str.translate
+_FILENAME_BAD_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Leftovers next to a yt-dlp output: per-format streams before merging
+# (name.f137.mp4), partial downloads and fragments (.part, .part-Frag3, .ytdl)
+# and the merger's temporary file (name.temp.mp4)
+_PARTIAL_SUFFIX_RE = re.compile(r'^\.f\d[\w-]*\.|\.(part|ytdl|temp|tmp)(-Frag\d+)?(\.|$)')
+
+
+def download_with_ytdlp(ydl_opts: dict, url: str) -> dict:
+    """Download url with yt-dlp and return its info dict (blocking)."""
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        return ydl.extract_info(url, download=True)
+
+
+def download_into(ydl: yt_dlp.YoutubeDL, output_dir: str, url: str) -> dict:
+    """Download url into output_dir with an open YoutubeDL and return its info dict (blocking).
+
+    Lets a batch reuse one YoutubeDL, with its HTTP connection pool and
+    initialized extractors, for consecutive downloads; it must not be used
+    by two downloads at once. The options' outtmpl must be relative.
+    """
+    ydl.params['paths'] = {'home': output_dir}
+    return ydl.extract_info(url, download=True)
+
+
+@lru_cache(maxsize=1)
+def external_downloader_options() -> dict:
+    """yt-dlp options handing plain HTTP(S) downloads to aria2c, when installed.
+
+    aria2c fetches each file over 16 parallel range requests instead of the
+    single connection of yt-dlp's native downloader.
+    """
+    if not shutil.which('aria2c'):
+        logger.info("ℹ️ aria2c não encontrado, usando o downloader nativo do yt-dlp")
+        return {}
+    
+    logger.info("⚡ aria2c encontrado, downloads com conexões paralelas")
+    return {
+        'external_downloader': {'http': 'aria2c'},
+        'external_downloader_args': {
+            'aria2c': ['-x', '16', '-s', '16', '-k', '1M', '--file-allocation=none']
+        },
+    }
+
+
+def downloaded_filepath(info: dict) -> Optional[str]:
+    """Return the output path of a finished yt-dlp download, after post-processing.
+
+    If that file is missing (a postprocessor changed the extension without
+    reporting it), a complete file with the same name stem is returned
+    instead, preferring the final extension yt-dlp reports (e.g. the merge
+    format) over other leftovers.
+    """
+    requested = info.get('requested_downloads') or [{}]
+    filepath = requested[0].get('filepath') or info.get('filepath') or info.get('_filename')
+    if filepath and not os.path.exists(filepath):
+        stem = os.path.splitext(filepath)[0]
+        matches = [
+            match for match in glob.glob(glob.escape(stem) + '.*')
+            if not _PARTIAL_SUFFIX_RE.search(match[len(stem):])
+        ]
+        final_ext = '.' + (requested[0].get('ext') or info.get('ext') or '')
+        matches.sort(key=lambda match: os.path.splitext(match)[1] != final_ext)
+        filepath = matches[0] if matches else None
+    return filepath
+
 
 class VideoDownloadService:
     def __init__(self):
@@ -34,16 +107,30 @@ class VideoDownloadService:
             logger.error(f"❌ FFmpeg local não encontrado: {self.ffmpeg_path}")
             self.ffmpeg_path = None
             self.ffprobe_path = None
-    
-    async def download_video(self, url: str) -> Tuple[str, str, dict]:
-        """Download video from YouTube URL and return filepath, filename and metadata."""
-        temp_dir = tempfile.mkdtemp()
-        output_template = os.path.join(temp_dir, "%(title)s.%(ext)s")
+            return
         
+        # Expose FFmpeg to yt-dlp's postprocessors once, not on every download
+        current_path = os.environ.get('PATH', '')
+        if ffmpeg_dir not in current_path:
+            os.environ['PATH'] = f"{ffmpeg_dir}:{current_path}"
+            logger.info(f"🔧 FFmpeg adicionado ao PATH: {ffmpeg_dir}")
+        
+        os.environ['FFMPEG_BINARY'] = self.ffmpeg_path
+        if self.ffprobe_path:
+            os.environ['FFPROBE_BINARY'] = self.ffprobe_path
+        else:
+            os.environ['FFPROBE_BINARY'] = self.ffmpeg_path
+    
+    def _video_ydl_opts(self) -> dict:
+        """yt-dlp options for video downloads, without the output directory."""
         # Configure for best quality video + audio (prioritize 1080p but allow higher)
         ydl_opts = {
             'format': 'bestvideo[height>=1080]+bestaudio/bestvideo+bestaudio/best',
-            'outtmpl': output_template,
+            # Highest resolution first; at the same resolution prefer H.264
+            # (an mp4 extension alone also matches AV1) and then MP4/M4A
+            # streams, which merge into the MP4 output as a plain stream copy
+            'format_sort': ['res', 'vcodec:h264', 'ext:mp4:m4a'],
+            'outtmpl': "%(title)s.%(ext)s",  # inside each download's temp dir ('paths')
             'merge_output_format': 'mp4',
             'writeinfojson': False,
             'writesubtitles': False,
@@ -53,84 +140,64 @@ class VideoDownloadService:
             'extract_flat': False,
         }
         
+        ydl_opts.update(external_downloader_options())
+        
         # Configure FFmpeg for yt-dlp
         if self.ffmpeg_path:
-            ffmpeg_dir = os.path.dirname(self.ffmpeg_path)
-            
-            # Set FFmpeg location for yt-dlp
-            ydl_opts['ffmpeg_location'] = ffmpeg_dir
-            
-            # Add FFmpeg directory to PATH
-            current_path = os.environ.get('PATH', '')
-            if ffmpeg_dir not in current_path:
-                os.environ['PATH'] = f"{ffmpeg_dir}:{current_path}"
-                logger.info(f"🔧 FFmpeg adicionado ao PATH: {ffmpeg_dir}")
-            
-            # Set environment variables
-            os.environ['FFMPEG_BINARY'] = self.ffmpeg_path
-            if self.ffprobe_path:
-                os.environ['FFPROBE_BINARY'] = self.ffprobe_path
-            else:
-                os.environ['FFPROBE_BINARY'] = self.ffmpeg_path
+            ydl_opts['ffmpeg_location'] = os.path.dirname(self.ffmpeg_path)
+        
+        return ydl_opts
+    
+    async def download_video(self, url: str, ydl: Optional[yt_dlp.YoutubeDL] = None) -> Tuple[str, str, dict]:
+        """Download video from YouTube URL and return filepath, filename and metadata.
+
+        ydl is an open YoutubeDL with _video_ydl_opts() to reuse (see
+        download_videos); without it a new one is created and closed.
+        """
+        temp_dir = tempfile.mkdtemp()
         
         try:
             logger.info(f"📥 Iniciando download do vídeo: {url}")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                duration = info.get('duration', 0)
-                title = info.get('title', 'unknown')
-                uploader = info.get('uploader', 'unknown')
-                view_count = info.get('view_count', 0)
-                width = info.get('width', 'unknown')
-                height = info.get('height', 'unknown')
-                format_id = info.get('format_id', 'unknown')
-                
-                logger.info(f"📁 Título: {title}")
-                logger.info(f"⏱️ Duração: {duration}s")
-                logger.info(f"📺 Resolução: {width}x{height}")
-                logger.info(f"🎬 Format ID: {format_id}")
-                
-                # Find the downloaded video file
-                video_file = None
-                files_in_dir = os.listdir(temp_dir)
-                logger.info(f"📂 Arquivos baixados: {files_in_dir}")
-                
-                # Look for MP4 first, then other formats
-                for file in files_in_dir:
-                    if file.endswith('.mp4'):
-                        video_file = os.path.join(temp_dir, file)
-                        logger.info(f"🎬 Arquivo MP4 encontrado: {video_file}")
-                        break
-                
-                if not video_file:
-                    # Fallback to other video formats
-                    video_extensions = ['.mkv', '.webm', '.avi', '.mov', '.flv']
-                    for file in files_in_dir:
-                        for ext in video_extensions:
-                            if file.endswith(ext):
-                                video_file = os.path.join(temp_dir, file)
-                                logger.info(f"🎬 Arquivo de vídeo encontrado: {video_file}")
-                                break
-                        if video_file:
-                            break
-                
-                if not video_file:
-                    raise Exception("Arquivo de vídeo não encontrado após download")
-                
-                # Generate safe filename
-                safe_title = self._sanitize_filename(title)
-                filename = f"{safe_title}.mp4"
-                
-                metadata = {
-                    'title': title,
-                    'duration': duration,
-                    'uploader': uploader,
-                    'view_count': view_count,
-                    'original_url': url
-                }
-                
-                return video_file, filename, metadata
-                
+            # yt-dlp blocks on the network; keep it off the event loop
+            if ydl is None:
+                ydl_opts = self._video_ydl_opts()
+                ydl_opts['paths'] = {'home': temp_dir}
+                info = await run_in_thread(download_with_ytdlp, ydl_opts, url)
+            else:
+                info = await run_in_thread(download_into, ydl, temp_dir, url)
+            duration = info.get('duration', 0)
+            title = info.get('title', 'unknown')
+            uploader = info.get('uploader', 'unknown')
+            view_count = info.get('view_count', 0)
+            width = info.get('width', 'unknown')
+            height = info.get('height', 'unknown')
+            format_id = info.get('format_id', 'unknown')
+            
+            logger.info(f"📁 Título: {title}")
+            logger.info(f"⏱️ Duração: {duration}s")
+            logger.info(f"📺 Resolução: {width}x{height}")
+            logger.info(f"🎬 Format ID: {format_id}")
+            
+            # yt-dlp reports the final (merged) output path
+            video_file = downloaded_filepath(info)
+            if not video_file:
+                raise Exception("Arquivo de vídeo não encontrado após download")
+            logger.info(f"🎬 Arquivo de vídeo baixado: {video_file}")
+            
+            # Generate safe filename
+            safe_title = self._sanitize_filename(title)
+            filename = f"{safe_title}.mp4"
+            
+            metadata = {
+                'title': title,
+                'duration': duration,
+                'uploader': uploader,
+                'view_count': view_count,
+                'original_url': url
+            }
+            
+            return video_file, filename, metadata
+            
         except yt_dlp.DownloadError as e:
             # Clean up temp directory on error
             self._cleanup_temp_dir(temp_dir)
@@ -150,11 +217,35 @@ class VideoDownloadService:
                 raise Exception("Erro de conexão com YouTube. Tente novamente em alguns minutos")
             raise Exception(f"Erro inesperado no download: {str(e)}")
     
+    async def download_videos(self, urls: List[str], concurrency: int = 4) -> List[Union[Tuple[str, str, dict], Exception]]:
+        """Download several URLs in parallel, at most concurrency at a time.
+
+        Results follow the order of urls; a failed download yields its exception.
+        Each of the concurrency lanes downloads its URLs one after another with
+        its own YoutubeDL, closed when the batch is done.
+        """
+        results: list = [None] * len(urls)
+        pending = iter(enumerate(urls))
+        
+        async def lane():
+            ydl = await run_in_thread(yt_dlp.YoutubeDL, self._video_ydl_opts())
+            try:
+                for index, url in pending:
+                    try:
+                        results[index] = await self.download_video(url, ydl)
+                    except Exception as e:
+                        results[index] = e
+            finally:
+                await run_in_thread(ydl.close)
+        
+        await asyncio.gather(*(lane() for _ in range(min(concurrency, len(urls)))))
+        return results
+    
     def _sanitize_filename(self, filename: str) -> str:
         """Sanitize filename for safe filesystem usage."""
         # Replace problematic characters
-        filename = re.sub(r'[<>:"/\\|?*]', '', filename)
-        filename = re.sub(r'[\s]+', ' ', filename)  # Multiple spaces to single
+        filename = filename.translate(_FILENAME_BAD_CHARS)
+        filename = _WHITESPACE_RE.sub(' ', filename)  # Multiple spaces to single
         filename = filename.strip()
         
         # Limit length
@@ -164,25 +255,9 @@ class VideoDownloadService:
         return filename or "video"
     
     def _cleanup_temp_dir(self, temp_dir: str):
-        """Clean up temporary directory."""
-        try:
-            if os.path.exists(temp_dir):
-                for file in os.listdir(temp_dir):
-                    file_path = os.path.join(temp_dir, file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                os.rmdir(temp_dir)
-        except Exception:
-            pass  # Ignore cleanup errors
+        """Clean up temporary directory, including subdirectories left by yt-dlp."""
+        shutil.rmtree(temp_dir, ignore_errors=True)
     
     async def cleanup_temp_file(self, filepath: str):
-        """Clean up temporary video file."""
-        try:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                # Also remove the directory if it's empty
-                temp_dir = os.path.dirname(filepath)
-                if not os.listdir(temp_dir):
-                    os.rmdir(temp_dir)
-        except Exception:
-            pass  # Ignore cleanup errors
\ No newline at end of file
+        """Clean up temporary video file and its per-download directory."""
+        self._cleanup_temp_dir(os.path.dirname(filepath))
@@ -1,12 +1,22 @@
 import os
+import re
+import time
+import asyncio
+import shutil
 import tempfile
+import threading
 import subprocess
-import json
+import orjson
 import logging
-from typing import Tuple, Optional
+from collections import OrderedDict
+from typing import List, Tuple, Optional, Union
+from pathlib import Path
 import yt_dlp
-import aiofiles
-from .whisper_python_service import WhisperPythonService
+from .whisper_python_service import FASTER_WHISPER_AVAILABLE, WhisperPythonService
+from .executors import run_in_thread, run_process
+from . import whisper_server
+from .youtube_download_service import download_with_ytdlp, downloaded_filepath, external_downloader_options
+from .audio_service import prefetch_file, resolve_whisper_cpp_model, wav_duration, whisper_cpp_thread_args
 
 # Import imageio_ffmpeg only as fallback
 try:
@@ -19,6 +29,74 @@ except ImportError:
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upper bound for FFmpeg to download and decode a whole audio stream
+STREAM_DOWNLOAD_TIMEOUT = 3600
+
+# Resolves the direct URL of a video's best plain HTTP(S) audio stream
+_AUDIO_STREAM_OPTS = {
+    'format': 'bestaudio[protocol^=http]/bestaudio/best',
+    'quiet': True,
+    'no_warnings': False,
+}
+_ytdl_local = threading.local()
+
+# Resolved streams by video ID, reused for an hour (YouTube stream URLs stay
+# valid for several hours), e.g. when a user retries with another language
+STREAM_INFO_TTL = 3600
+STREAM_INFO_CACHE_SIZE = 256
+_VIDEO_ID_RE = re.compile(r'(?:v=|youtu\.be/|shorts/|embed/|live/)([\w-]{11})')
+# Only what download_audio uses is kept: the full info dict (formats,
+# thumbnails, subtitles) can take megabytes per video
+_STREAM_INFO_FIELDS = ('url', 'http_headers', 'protocol', 'format_id', 'duration', 'title')
+_stream_info_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+_stream_info_lock = threading.Lock()
+
+
+def _stream_cache_key(url: str) -> str:
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else url
+
+
+def _copy_stream_info(info: dict) -> dict:
+    """Copy of a cached stream info, so callers cannot modify the cache."""
+    return {**info, 'http_headers': dict(info.get('http_headers') or {})}
+
+
+def resolve_audio_stream(url: str) -> dict:
+    """Return url's audio stream (url, http_headers, protocol, format_id, duration, title).
+
+    Resolved by yt-dlp without downloading (blocking). Results are cached
+    per video ID for STREAM_INFO_TTL seconds. Each thread
+    keeps one YoutubeDL for these lookups, so consecutive requests reuse its
+    HTTP connection pool (no new DNS lookup or TLS handshake with YouTube)
+    and its initialized extractors.
+    """
+    key = _stream_cache_key(url)
+    with _stream_info_lock:
+        cached = _stream_info_cache.get(key)
+        if cached and time.monotonic() - cached[0] < STREAM_INFO_TTL:
+            _stream_info_cache.move_to_end(key)
+            return _copy_stream_info(cached[1])
+    
+    ydl = getattr(_ytdl_local, 'ydl', None)
+    if ydl is None:
+        ydl = _ytdl_local.ydl = yt_dlp.YoutubeDL(_AUDIO_STREAM_OPTS)
+    full_info = ydl.extract_info(url, download=False)
+    info = {field: full_info[field] for field in _STREAM_INFO_FIELDS if full_info.get(field) is not None}
+    
+    with _stream_info_lock:
+        _stream_info_cache[key] = (time.monotonic(), info)
+        _stream_info_cache.move_to_end(key)
+        while len(_stream_info_cache) > STREAM_INFO_CACHE_SIZE:
+            _stream_info_cache.popitem(last=False)
+    return _copy_stream_info(info)
+
+
+def forget_audio_stream(url: str):
+    """Drop url's cached stream info, e.g. after its stream URL stopped working."""
+    with _stream_info_lock:
+        _stream_info_cache.pop(_stream_cache_key(url), None)
+
 
 class YouTubeService:
     def __init__(self, whisper_path: str = "whisper"):
@@ -32,31 +110,35 @@ class YouTubeService:
         backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
         ffmpeg_dir = os.path.join(backend_root, 'tools', 'ffmpeg')
         self.ffmpeg_path = os.path.join(ffmpeg_dir, 'ffmpeg')
-        self.ffprobe_path = os.path.join(ffmpeg_dir, 'ffprobe')
         
-        # Check if local FFmpeg binaries exist and are executable
+        # Check if local FFmpeg binaries exist and are executable. The
+        # duration comes from yt-dlp, so ffprobe is optional (yt-dlp's own
+        # postprocessors find it through ffmpeg_location)
         if os.path.exists(self.ffmpeg_path) and os.access(self.ffmpeg_path, os.X_OK):
             logger.info(f"✅ FFmpeg local encontrado: {self.ffmpeg_path}")
-            if os.path.exists(self.ffprobe_path) and os.access(self.ffprobe_path, os.X_OK):
-                logger.info(f"✅ FFprobe local encontrado: {self.ffprobe_path}")
-            else:
-                logger.warning(f"⚠️ FFprobe não encontrado: {self.ffprobe_path}")
+            logger.debug("FFprobe local presente: %s", os.path.exists(os.path.join(ffmpeg_dir, 'ffprobe')))
         else:
             logger.warning(f"⚠️ FFmpeg local não encontrado: {self.ffmpeg_path}")
             # Fallback to imageio-ffmpeg if available
             if IMAGEIO_FFMPEG_AVAILABLE:
                 try:
                     self.ffmpeg_path = ffmpeg.get_ffmpeg_exe()
-                    self.ffprobe_path = None
                     logger.info(f"🔄 Usando imageio-ffmpeg como fallback: {self.ffmpeg_path}")
                 except Exception as e:
                     logger.error(f"❌ Erro ao usar imageio-ffmpeg: {e}")
                     self.ffmpeg_path = None
-                    self.ffprobe_path = None
             else:
                 logger.error(f"❌ Nenhum FFmpeg disponível (imageio-ffmpeg não instalado)")
                 self.ffmpeg_path = None
-                self.ffprobe_path = None
+        
+        # Expose FFmpeg to OpenAI Whisper and other tools once, not on every download
+        if self.ffmpeg_path:
+            ffmpeg_bin_dir = os.path.dirname(self.ffmpeg_path)
+            current_path = os.environ.get('PATH', '')
+            if ffmpeg_bin_dir not in current_path:
+                os.environ['PATH'] = f"{ffmpeg_bin_dir}:{current_path}"
+                logger.info(f"🔧 FFmpeg adicionado ao PATH: {ffmpeg_bin_dir}")
+            os.environ['FFMPEG_BINARY'] = self.ffmpeg_path
         
         # Check for whisper.cpp (real C++ implementation) first
         whisper_cpp_dir = os.path.join(backend_root, 'tools', 'whisper_cpp')
@@ -69,29 +151,24 @@ class YouTubeService:
             logger.warning(f"❌ whisper.cpp não encontrado: {self.whisper_cpp_path}")
             self.whisper_cpp_available = False
         
-        # Check for OpenAI Whisper CLI as secondary option
-        try:
-            result = subprocess.run([self.whisper_path, '--help'], 
-                                  capture_output=True, text=True, timeout=5)
-            logger.info(f"✅ OpenAI Whisper CLI encontrado: {self.whisper_path}")
-            self.openai_cli_available = True
-        except FileNotFoundError:
+        # Check for OpenAI Whisper CLI as secondary option. A PATH lookup is
+        # enough; running it would start a Python interpreter on every boot
+        self.whisper_cli_path = shutil.which(self.whisper_path)
+        self.openai_cli_available = self.whisper_cli_path is not None
+        if self.openai_cli_available:
+            logger.info(f"✅ OpenAI Whisper CLI encontrado: {self.whisper_cli_path}")
+        else:
             logger.warning(f"❌ OpenAI Whisper CLI não encontrado: {self.whisper_path}")
-            self.openai_cli_available = False
-        except subprocess.TimeoutExpired:
-            logger.info(f"✅ OpenAI Whisper CLI encontrado mas demorou para responder: {self.whisper_path}")
-            self.openai_cli_available = True
-        except Exception as e:
-            logger.warning(f"⚠️ Erro ao verificar OpenAI Whisper CLI: {e}")
-            self.openai_cli_available = False
         
         # Log the transcription options available
         options = []
         if self.whisper_cpp_available:
             options.append("whisper.cpp (C++)")
+        if FASTER_WHISPER_AVAILABLE:
+            options.append("faster-whisper (int8)")
         if self.openai_cli_available:
             options.append("OpenAI Whisper CLI")
-        if self.whisper_python.whisper_available:
+        if self.whisper_python.whisper_available and not FASTER_WHISPER_AVAILABLE:
             options.append("OpenAI Whisper Python")
         
         if options:
@@ -104,8 +181,9 @@ class YouTubeService:
         temp_dir = tempfile.mkdtemp()
         output_template = os.path.join(temp_dir, "%(title)s.%(ext)s")
         
+        # Audio stream only (m4a when offered): no video bytes are fetched or muxed
         ydl_opts = {
-            'format': 'bestaudio/best',
+            'format': 'bestaudio[ext=m4a]/bestaudio/best',
             'outtmpl': output_template,
             'extractaudio': True,
             'audioformat': 'wav',
@@ -113,73 +191,43 @@ class YouTubeService:
             'postprocessors': [{
                 'key': 'FFmpegExtractAudio',
                 'preferredcodec': 'wav',
-                'preferredquality': '192',
+                'preferredquality': '0',
             }],
+            # Write the 16kHz mono WAV Whisper consumes in the same FFmpeg pass
+            'postprocessor_args': {
+                'extractaudio+ffmpeg_o': ['-ar', '16000', '-ac', '1'],
+            },
             'quiet': True,
             'no_warnings': False,
         }
         
-        # Configure FFmpeg for yt-dlp and other tools
+        ydl_opts.update(external_downloader_options())
+        
+        # Set FFmpeg location for yt-dlp
         if self.ffmpeg_path:
-            ffmpeg_dir = os.path.dirname(self.ffmpeg_path)
-            
-            # Set FFmpeg location for yt-dlp
-            ydl_opts['ffmpeg_location'] = ffmpeg_dir
-            
-            # Add FFmpeg directory to PATH (for OpenAI Whisper and other tools)
-            current_path = os.environ.get('PATH', '')
-            if ffmpeg_dir not in current_path:
-                os.environ['PATH'] = f"{ffmpeg_dir}:{current_path}"
-                logger.info(f"🔧 FFmpeg adicionado ao PATH: {ffmpeg_dir}")
-            
-            # Set environment variables
-            os.environ['FFMPEG_BINARY'] = self.ffmpeg_path
-            if self.ffprobe_path:
-                os.environ['FFPROBE_BINARY'] = self.ffprobe_path
-                logger.info(f"🔧 Usando FFmpeg local: {self.ffmpeg_path}")
-                logger.info(f"🔧 Usando FFprobe local: {self.ffprobe_path}")
-            else:
-                os.environ['FFPROBE_BINARY'] = self.ffmpeg_path
-                logger.info(f"🔧 Usando FFmpeg local (sem ffprobe separado): {self.ffmpeg_path}")
-            
-            logger.info(f"📂 Diretório FFmpeg configurado: {ffmpeg_dir}")
+            ydl_opts['ffmpeg_location'] = os.path.dirname(self.ffmpeg_path)
         
         try:
             logger.info(f"📥 Iniciando download: {url}")
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                duration = info.get('duration', 0)
-                title = info.get('title', 'unknown')
-                logger.info(f"📁 Título: {title}, Duração: {duration}s")
-                
-                # Find the downloaded audio file
-                audio_file = None
-                files_in_dir = os.listdir(temp_dir)
-                logger.info(f"📂 Arquivos baixados: {files_in_dir}")
-                
-                # Look for WAV first (post-processed), then other formats
-                for file in files_in_dir:
-                    if file.endswith('.wav'):
-                        audio_file = os.path.join(temp_dir, file)
-                        logger.info(f"🎵 Arquivo WAV encontrado: {audio_file}")
-                        break
-                
-                if not audio_file:
-                    # Fallback to other audio formats
-                    audio_extensions = ['.m4a', '.webm', '.mp3', '.ogg']
-                    for file in files_in_dir:
-                        for ext in audio_extensions:
-                            if file.endswith(ext):
-                                audio_file = os.path.join(temp_dir, file)
-                                logger.info(f"🎵 Arquivo de áudio encontrado: {audio_file}")
-                                break
-                        if audio_file:
-                            break
-                
-                if not audio_file:
-                    raise Exception("Audio file not found after download")
-                
-                return audio_file, duration
+            if self.ffmpeg_path:
+                streamed = await self._stream_audio_to_wav(url, temp_dir)
+                if streamed:
+                    return streamed
+            
+            # yt-dlp blocks on the network; keep it off the event loop
+            info = await run_in_thread(download_with_ytdlp, ydl_opts, url)
+            duration = info.get('duration', 0)
+            title = info.get('title', 'unknown')
+            logger.info(f"📁 Título: {title}, Duração: {duration}s")
+            
+            # yt-dlp reports the final path, i.e. the WAV written by FFmpegExtractAudio
+            audio_file = downloaded_filepath(info)
+            if not audio_file:
+                raise Exception("Audio file not found after download")
+            logger.info(f"🎵 Arquivo de áudio baixado: {audio_file}")
+            
+            # Read it from the WAV header when yt-dlp has no duration
+            return audio_file, duration or wav_duration(audio_file)
         except yt_dlp.DownloadError as e:
             # Clean up temp directory on error
             self._cleanup_temp_dir(temp_dir)
@@ -199,20 +247,69 @@ class YouTubeService:
                 raise Exception("Erro de conexão com YouTube. Tente novamente em alguns minutos")
             raise Exception(f"Erro inesperado no download: {str(e)}")
     
+    async def download_audio_batch(self, urls: List[str], concurrency: int = 4) -> List[Union[Tuple[str, float], Exception]]:
+        """Download the audio of several URLs in parallel, at most concurrency at a time.
+
+        Results follow the order of urls; a failed download yields its exception.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def download(url: str) -> Tuple[str, float]:
+            async with semaphore:
+                return await self.download_audio(url)
+        
+        return await asyncio.gather(*(download(url) for url in urls), return_exceptions=True)
+    
+    async def _stream_audio_to_wav(self, url: str, temp_dir: str) -> Optional[Tuple[str, float]]:
+        """Decode the audio stream straight from YouTube into a 16kHz mono WAV.
+
+        yt-dlp only resolves the stream URL; FFmpeg reads it and resamples
+        while downloading, so no intermediate container file is written.
+        Returns None when the stream is not a plain HTTP(S) file or FFmpeg
+        fails, so the caller can fall back to a regular yt-dlp download.
+        """
+        info = await run_in_thread(resolve_audio_stream, url)
+        if info.get('protocol') not in ('http', 'https') or not info.get('url'):
+            return None
+        
+        duration = info.get('duration', 0)
+        logger.info(f"📁 Título: {info.get('title', 'unknown')}, Duração: {duration}s")
+        
+        audio_file = os.path.join(temp_dir, "audio.wav")
+        headers = "".join(f"{name}: {value}\r\n" for name, value in info.get('http_headers', {}).items())
+        cmd = [
+            self.ffmpeg_path, "-hide_banner", "-loglevel", "error",
+            "-reconnect", "1", "-reconnect_streamed", "1", "-reconnect_delay_max", "5",
+            "-headers", headers,
+            "-i", info['url'],
+            "-vn",  # No video
+            "-acodec", "pcm_s16le",  # PCM 16-bit
+            "-ar", "16000",  # 16kHz sample rate
+            "-ac", "1",  # Mono
+            audio_file, "-y"
+        ]
+        
+        logger.info(f"🎵 Extraindo áudio diretamente do stream ({info.get('format_id', 'unknown')})")
+        result = await run_process(cmd, timeout=STREAM_DOWNLOAD_TIMEOUT)
+        if result.returncode != 0:
+            logger.warning(f"⚠️ Extração via stream falhou, usando download do yt-dlp: {result.stderr.decode(errors='replace')[-500:]}")
+            forget_audio_stream(url)
+            if os.path.exists(audio_file):
+                os.remove(audio_file)
+            return None
+        
+        logger.info(f"🎵 Arquivo de áudio baixado: {audio_file}")
+        return audio_file, duration or wav_duration(audio_file)
+    
     def _cleanup_temp_dir(self, temp_dir: str):
-        """Clean up temporary directory."""
-        try:
-            if os.path.exists(temp_dir):
-                for file in os.listdir(temp_dir):
-                    file_path = os.path.join(temp_dir, file)
-                    if os.path.isfile(file_path):
-                        os.remove(file_path)
-                os.rmdir(temp_dir)
-        except Exception:
-            pass  # Ignore cleanup errors
+        """Clean up temporary directory, including subdirectories left by yt-dlp."""
+        shutil.rmtree(temp_dir, ignore_errors=True)
     
-    async def transcribe_audio(self, audio_file: str, language: str = "auto") -> Tuple[str, str]:
-        """Transcribe audio file using available transcription method."""
+    async def transcribe_audio(self, audio_file: str, language: str = "auto", duration: float = 0.0) -> Tuple[str, str]:
+        """Transcribe audio file using available transcription method.
+
+        duration (seconds, when already known) sizes the OpenAI CLI timeout.
+        """
         
         # 1st priority: Try whisper.cpp (real C++ implementation)
         if self.whisper_cpp_available:
@@ -222,16 +319,27 @@ class YouTubeService:
                 logger.warning(f"⚠️ whisper.cpp falhou: {e}")
                 logger.info("🔄 Tentando com OpenAI Whisper CLI...")
         
-        # 2nd priority: Try OpenAI Whisper CLI
+        # 2nd priority: faster-whisper in the transcription process pool, which
+        # beats spawning the reference OpenAI Whisper CLI for every file
+        faster_whisper_failed = False
+        if FASTER_WHISPER_AVAILABLE and self.whisper_python.whisper_available:
+            try:
+                return await self.whisper_python.transcribe_audio(audio_file, language)
+            except Exception as e:
+                logger.warning(f"⚠️ faster-whisper falhou: {e}")
+                logger.info("🔄 Tentando com OpenAI Whisper CLI...")
+                faster_whisper_failed = True
+        
+        # 3rd priority: Try OpenAI Whisper CLI
         if self.openai_cli_available:
             try:
-                return await self._transcribe_with_openai_cli(audio_file, language)
+                return await self._transcribe_with_openai_cli(audio_file, language, duration)
             except Exception as e:
                 logger.warning(f"⚠️ OpenAI Whisper CLI falhou: {e}")
                 logger.info("🔄 Tentando com OpenAI Whisper Python...")
         
-        # 3rd priority: Fallback to OpenAI Whisper Python library
-        if self.whisper_python.whisper_available:
+        # 4th priority: Fallback to OpenAI Whisper Python library
+        if self.whisper_python.whisper_available and not faster_whisper_failed:
             return await self.whisper_python.transcribe_audio(audio_file, language)
         
         # No transcription method available
@@ -239,9 +347,19 @@ class YouTubeService:
     
     async def _transcribe_with_whisper_cpp(self, audio_file: str, language: str = "auto") -> Tuple[str, str]:
         """Transcribe using real whisper.cpp (C++ implementation)."""
+        await run_in_thread(prefetch_file, audio_file)
+        
+        # Prefer the long-lived whisper-server, which already has the model loaded
+        if whisper_server.is_available():
+            try:
+                transcription, detected_language, _ = await whisper_server.transcribe(audio_file, language)
+                return transcription, detected_language
+            except Exception as e:
+                logger.warning(f"⚠️ whisper-server falhou, executando whisper.cpp: {e}")
+        
         # Get model path (relative to backend root)
         backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        model_path = os.path.join(backend_root, 'tools', 'whisper_cpp', 'ggml-base.bin')
+        model_path = resolve_whisper_cpp_model(os.path.join(backend_root, 'tools', 'whisper_cpp'))
         
         # Map language parameter for whisper.cpp
         if language == "auto":
@@ -252,68 +370,66 @@ class YouTubeService:
         # Build command for whisper.cpp
         cmd = [self.whisper_cpp_path, "-m", model_path, "-f", audio_file] + lang_param + ["-oj"]
         
-        logger.info(f"🤖 Executando whisper.cpp: {' '.join(cmd)}")
-        
         # Set environment to find shared libraries
         env = os.environ.copy()
         whisper_cpp_dir = os.path.dirname(self.whisper_cpp_path)
         env['LD_LIBRARY_PATH'] = f"{whisper_cpp_dir}:{env.get('LD_LIBRARY_PATH', '')}"
+        cmd += whisper_cpp_thread_args(env)
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🤖 Executando whisper.cpp: %s", ' '.join(cmd))
         
         try:
-            result = subprocess.run(
+            result = await run_process(
                 cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True,
                 timeout=300,  # 5 minutes timeout
-                env=env
+                env=env,
+                check=True
             )
             logger.info(f"✅ whisper.cpp executado com sucesso")
             
             # Parse whisper.cpp JSON output
             json_file = audio_file + ".json"
             if os.path.exists(json_file):
-                async with aiofiles.open(json_file, 'r') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    
-                    # Extract transcription from whisper.cpp JSON format
-                    transcription = ""
-                    if 'transcription' in data and isinstance(data['transcription'], list):
-                        # whisper.cpp format: list of segments with 'text' field
-                        for segment in data['transcription']:
-                            if isinstance(segment, dict) and 'text' in segment:
-                                transcription += segment['text']
-                            else:
-                                transcription += str(segment)
-                    elif 'text' in data:
-                        if isinstance(data['text'], list):
-                            transcription = ' '.join(str(item) for item in data['text'])
-                        else:
-                            transcription = str(data['text'])
+                content = await run_in_thread(Path(json_file).read_bytes)
+                data = orjson.loads(content)
+                
+                # Extract transcription from whisper.cpp JSON format
+                transcription = ""
+                if 'transcription' in data and isinstance(data['transcription'], list):
+                    # whisper.cpp format: list of segments with 'text' field
+                    transcription = "".join(
+                        segment['text'] if isinstance(segment, dict) and 'text' in segment else str(segment)
+                        for segment in data['transcription']
+                    )
+                elif 'text' in data:
+                    if isinstance(data['text'], list):
+                        transcription = ' '.join(str(item) for item in data['text'])
+                    else:
+                        transcription = str(data['text'])
+                else:
+                    # Try to extract from segments (OpenAI format)
+                    if 'segments' in data:
+                        transcription = "".join(
+                            str(segment['text']) for segment in data['segments'] if 'text' in segment
+                        )
                     else:
-                        # Try to extract from segments (OpenAI format)
-                        if 'segments' in data:
-                            for segment in data['segments']:
-                                if 'text' in segment:
-                                    transcription += str(segment['text'])
-                        else:
-                            transcription = str(data)
-                    
-                    # Get detected language from whisper.cpp JSON format
-                    detected_language = language  # default
-                    if 'result' in data and 'language' in data['result']:
-                        detected_language = data['result']['language']
-                    elif 'language' in data:
-                        detected_language = data['language']
-                    
-                    # Clean up JSON file
-                    os.remove(json_file)
-                    
-                    return transcription.strip(), detected_language
+                        transcription = str(data)
+                
+                # Get detected language from whisper.cpp JSON format
+                detected_language = language  # default
+                if 'result' in data and 'language' in data['result']:
+                    detected_language = data['result']['language']
+                elif 'language' in data:
+                    detected_language = data['language']
+                
+                # Clean up JSON file
+                os.remove(json_file)
+                
+                return transcription.strip(), detected_language
             else:
                 # Fallback: parse stdout if JSON file not found
-                return result.stdout.strip(), language
+                return result.stdout.decode(errors='replace').strip(), language
                 
         except subprocess.CalledProcessError as e:
             logger.error(f"❌ whisper.cpp falhou: {e.stderr}")
@@ -321,7 +437,7 @@ class YouTubeService:
         except subprocess.TimeoutExpired:
             raise Exception("whisper.cpp timeout - arquivo muito longo")
     
-    async def _transcribe_with_openai_cli(self, audio_file: str, language: str = "auto") -> Tuple[str, str]:
+    async def _transcribe_with_openai_cli(self, audio_file: str, language: str = "auto", duration: float = 0.0) -> Tuple[str, str]:
         """Transcribe using OpenAI Whisper CLI (not whisper.cpp)."""
         # Map language parameter
         if language == "auto":
@@ -330,7 +446,7 @@ class YouTubeService:
             lang_param = language
         
         # Build command for OpenAI Whisper CLI with optimizations
-        cmd = [self.whisper_path, audio_file]
+        cmd = [self.whisper_cli_path, audio_file]
         if lang_param:
             cmd.extend(["--language", lang_param])
         cmd.extend([
@@ -344,19 +460,20 @@ class YouTubeService:
         output_dir = os.path.dirname(audio_file)
         cmd.extend(["--output_dir", output_dir])
         
-        logger.info(f"🤖 Executando OpenAI Whisper CLI: {' '.join(cmd)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🤖 Executando OpenAI Whisper CLI: %s", ' '.join(cmd))
         
         try:
-            # Calculate timeout based on audio duration (approximately 1/10 of audio length + 60s base)
-            timeout_seconds = max(120, min(600, int(os.path.getsize(audio_file) / 1000000) * 10 + 60))
+            # Timeout from the audio length (half of it + 60s base); the file
+            # size says little about it, as bitrates vary by an order of magnitude
+            duration = duration or wav_duration(audio_file)
+            timeout_seconds = max(120, int(duration * 0.5) + 60)
             logger.info(f"⏱️ Timeout configurado: {timeout_seconds}s")
             
-            result = subprocess.run(
+            result = await run_process(
                 cmd, 
-                capture_output=True, 
-                text=True, 
-                check=True,
-                timeout=timeout_seconds
+                timeout=timeout_seconds,
+                check=True
             )
             logger.info(f"✅ OpenAI Whisper CLI executado com sucesso")
             
@@ -365,36 +482,34 @@ class YouTubeService:
             json_file = os.path.join(output_dir, f"{base_name}.json")
             
             if os.path.exists(json_file):
-                async with aiofiles.open(json_file, 'r') as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    
-                    # Extract text from OpenAI Whisper JSON format
-                    if 'text' in data:
-                        transcription = data['text'].strip()
-                    elif 'segments' in data:
-                        # Extract from segments if available
-                        transcription = ' '.join(segment.get('text', '') for segment in data['segments']).strip()
-                    else:
-                        transcription = str(data).strip()
-                    
-                    detected_language = data.get('language', language)
-                    
-                    # Clean up JSON file
-                    os.remove(json_file)
-                    
-                    return transcription, detected_language
+                content = await run_in_thread(Path(json_file).read_bytes)
+                data = orjson.loads(content)
+                
+                # Extract text from OpenAI Whisper JSON format
+                if 'text' in data:
+                    transcription = data['text'].strip()
+                elif 'segments' in data:
+                    # Extract from segments if available
+                    transcription = ' '.join(segment.get('text', '') for segment in data['segments']).strip()
+                else:
+                    transcription = str(data).strip()
+                
+                detected_language = data.get('language', language)
+                
+                # Clean up JSON file
+                os.remove(json_file)
+                
+                return transcription, detected_language
             else:
                 # Fallback: try to find txt file
                 txt_file = os.path.join(output_dir, f"{base_name}.txt")
                 if os.path.exists(txt_file):
-                    async with aiofiles.open(txt_file, 'r') as f:
-                        transcription = await f.read()
-                        os.remove(txt_file)  # Clean up
-                        return transcription.strip(), language
+                    transcription = await run_in_thread(Path(txt_file).read_text)
+                    os.remove(txt_file)  # Clean up
+                    return transcription.strip(), language
                 
                 # Last fallback: use stdout
-                return result.stdout.strip(), language
+                return result.stdout.decode(errors='replace').strip(), language
                 
         except subprocess.CalledProcessError as e:
             logger.error(f"❌ OpenAI Whisper CLI falhou: {e.stderr}")
@@ -403,16 +518,8 @@ class YouTubeService:
             raise Exception("OpenAI Whisper CLI timeout - arquivo muito longo")
     
     async def cleanup_temp_file(self, filepath: str):
-        """Clean up temporary audio file."""
-        try:
-            if os.path.exists(filepath):
-                os.remove(filepath)
-                # Also remove the directory if it's empty
-                temp_dir = os.path.dirname(filepath)
-                if not os.listdir(temp_dir):
-                    os.rmdir(temp_dir)
-        except Exception:
-            pass  # Ignore cleanup errors
+        """Clean up temporary audio file and its per-download directory."""
+        self._cleanup_temp_dir(os.path.dirname(filepath))
     
     async def process_youtube_video(self, url: str, language: str = "auto") -> dict:
         """Complete pipeline: download audio and transcribe."""
@@ -422,7 +529,7 @@ class YouTubeService:
             audio_file, duration = await self.download_audio(url)
             
             # Transcribe audio
-            transcription, detected_language = await self.transcribe_audio(audio_file, language)
+            transcription, detected_language = await self.transcribe_audio(audio_file, language, duration)
             
             return {
                 "transcription": transcription,
@@ -0,0 +1,15 @@
+"""Gunicorn worker class that pins Uvicorn to uvloop and httptools."""
+from typing import Any
+
+from uvicorn.workers import UvicornWorker
+
+
+class UvloopWorker(UvicornWorker):
+    """UvicornWorker that fails fast instead of silently falling back to asyncio/h11."""
+
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # UvicornWorker ignores Gunicorn's worker_connections; map it to Uvicorn's limit
+        self.config.limit_concurrency = self.cfg.worker_connections
@@ -1,11 +1,35 @@
 #!/usr/bin/env python3
+import functools
 import http.server
-import socketserver
 import os
 import sys
 from pathlib import Path
 
+# uvicorn and Starlette come with the backend requirements; without them the
+# stdlib server is used
+try:
+    import anyio
+    import uvicorn
+    from starlette.applications import Starlette
+    from starlette.datastructures import Headers
+    from starlette.middleware import Middleware
+    from starlette.middleware.cors import CORSMiddleware
+    from starlette.responses import FileResponse, Response
+    from starlette.routing import Mount
+    from starlette.staticfiles import NotModifiedResponse, StaticFiles
+    UVICORN_AVAILABLE = True
+except ImportError:
+    UVICORN_AVAILABLE = False
+
+# Brotli (also a backend requirement) compresses text assets for clients that accept br
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
 PORT = 3000
+COMPRESSIBLE_EXTENSIONS = {'.html', '.js', '.css'}
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
     def end_headers(self):
@@ -14,19 +38,90 @@ class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         super().end_headers()
 
+@functools.lru_cache(maxsize=64)
+def _brotli_body(full_path: str, mtime_ns: int) -> bytes:
+    """Brotli-compress a static file once per modification time."""
+    with open(full_path, 'rb') as f:
+        return brotli.compress(f.read(), quality=11)
+
+def _accepts_brotli(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows br (honouring q=0 and *)."""
+    qualities = {}
+    for token in accept_encoding.split(','):
+        coding, _, params = token.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.strip().lower()] = quality
+    return qualities.get('br', qualities.get('*', 0.0)) > 0
+
+def _brotli_etag(etag: str) -> str:
+    """ETag of the br representation: the file's ETag with a -br suffix inside its quotes."""
+    if etag.endswith('"'):
+        return etag[:-1] + '-br"'
+    return f"{etag}-br"
+
+if UVICORN_AVAILABLE:
+    class BrotliStaticFiles(StaticFiles):
+        """StaticFiles that answers with cached Brotli bodies when the client accepts br."""
+
+        async def get_response(self, path, scope):
+            response = await super().get_response(path, scope)
+            if not isinstance(response, FileResponse) or os.path.splitext(str(response.path))[1] not in COMPRESSIBLE_EXTENSIONS:
+                return response
+            response.headers['vary'] = 'Accept-Encoding'
+
+            request_headers = Headers(scope=scope)
+            if not BROTLI_AVAILABLE or response.status_code != 200 or not _accepts_brotli(request_headers.get('accept-encoding', '')):
+                return response
+
+            # The br body is a different representation, so it gets its own ETag
+            headers = {key: value for key, value in response.headers.items() if key != 'content-length'}
+            headers['etag'] = _brotli_etag(response.headers['etag'])
+            headers['content-encoding'] = 'br'
+            if self.is_not_modified(Headers(headers), request_headers):
+                return NotModifiedResponse(Headers(headers))
+
+            # Quality 11 is slow: compress in a worker thread, once per file version
+            body = await anyio.to_thread.run_sync(_brotli_body, str(response.path), response.stat_result.st_mtime_ns)
+            return Response(body, status_code=response.status_code, headers=headers)
+
+def create_app(frontend_dir: Path) -> "Starlette":
+    """Starlette app serving the frontend directory (index.html for /)."""
+    return Starlette(
+        routes=[Mount('/', app=BrotliStaticFiles(directory=str(frontend_dir), html=True))],
+        middleware=[Middleware(
+            CORSMiddleware,
+            allow_origins=['*'],
+            allow_methods=['GET', 'POST', 'OPTIONS'],
+            allow_headers=['Content-Type']
+        )]
+    )
+
 def main():
     # Change to frontend directory
     frontend_dir = Path(__file__).parent
     os.chdir(frontend_dir)
-    
-    handler = MyHTTPRequestHandler
-    
-    with socketserver.TCPServer(("", PORT), handler) as httpd:
-        print(f"🌐 Servidor frontend rodando em http://localhost:{PORT}")
-        print("📝 Abra o navegador e acesse o endereço acima para testar a interface")
-        print("⚠️  Certifique-se de que a API esteja rodando em http://localhost:8000")
-        print("\n🛑 Pressione Ctrl+C para parar o servidor")
-        
+
+    print(f"🌐 Servidor frontend rodando em http://localhost:{PORT}")
+    print("📝 Abra o navegador e acesse o endereço acima para testar a interface")
+    print("⚠️  Certifique-se de que a API esteja rodando em http://localhost:8000")
+    print("\n🛑 Pressione Ctrl+C para parar o servidor")
+
+    if UVICORN_AVAILABLE:
+        # One event loop serves all connections concurrently; HTTP/1.1
+        # keep-alive lets the page's asset requests reuse one connection
+        uvicorn.run(create_app(frontend_dir), host="0.0.0.0", port=PORT, log_level="warning", timeout_keep_alive=30)
+        print("\n✅ Servidor parado.")
+        return
+
+    # One thread per connection, so a slow client does not block the others
+    with http.server.ThreadingHTTPServer(("", PORT), MyHTTPRequestHandler) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt:
@@ -34,4 +129,4 @@ def main():
             sys.exit(0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()